@@ -1,343 +1,391 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Query, Header, Response
+from typing import List, Optional
+from datetime import datetime, timezone
+import time
 
-from app.database.session import get_db
-from app.services.chat_service import ChatService
+from app.services.async_chat_service import AsyncChatService, get_chat_service
+from app.services.room_hub import room_hub
+from app.services.presence import presence_service
+from app.api.http_cache import etag_matches, room_messages_etag
+from app.api.serialization import respond
+from app.models.database import User, Room, Message
 from app.schemas.chat import (
     UserCreate, UserResponse, RoomCreate, RoomResponse, 
-    MessageCreate, MessageResponse, JoinRoomRequest, LeaveRoomRequest
+    MessageCreate, MessageResponse, JoinRoomRequest, LeaveRoomRequest,
+    BulkMessageCreate, BulkMessageResponse, RoomRetentionUpdate, ArchiveRunResponse,
+    MessageSearchResult
 )
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
+def user_response(user: User) -> UserResponse:
+    """
+    Build a UserResponse from the ORM attributes, with is_online and
+    last_seen from in-memory presence (the users table lags by up to a flush)
+    """
+    is_online, last_seen = presence_service.status(user.id)
+    return UserResponse(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        is_online=is_online,
+        last_seen=last_seen or user.last_seen,
+        created_at=user.created_at
+    )
+
+def room_response(room: Room) -> RoomResponse:
+    """Build a RoomResponse with its eager-loaded participants"""
+    return RoomResponse(
+        id=room.id,
+        name=room.name,
+        created_by=room.created_by,
+        created_at=room.created_at,
+        last_activity=room.last_activity,
+        retention_days=room.retention_days,
+        participants=[user_response(p) for p in AsyncChatService.participant_users(room)]
+    )
+
+def message_response(message: Message, sender_username: Optional[str], teleportation_result: Optional[dict]) -> MessageResponse:
+    """Build a MessageResponse from a message, its sender's username and its expanded result"""
+    return MessageResponse(
+        id=message.id,
+        room_id=message.room_id,
+        sender_id=message.sender_id,
+        sender_username=sender_username or "Unknown",
+        content=message.content,
+        quantum_state=message.quantum_state,
+        teleportation_result=teleportation_result,
+        status=message.status,
+        created_at=message.created_at
+    )
+
 # User endpoints
 @router.post("/users", response_model=UserResponse)
-async def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user_data: UserCreate, chat_service: AsyncChatService = Depends(get_chat_service)):
     """Create a new user"""
-    chat_service = ChatService(db)
-    
     # Check if username already exists
-    existing_user = chat_service.get_user_by_username(user_data.username)
+    existing_user = await chat_service.get_user_by_username(user_data.username)
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already exists")
     
-    user = chat_service.create_user(user_data)
-    return UserResponse(
-        id=user.id,
-        username=user.username,
-        email=user.email,
-        is_online=user.is_online,
-        last_seen=user.last_seen,
-        created_at=user.created_at
-    )
+    user = await chat_service.create_user(user_data)
+    return respond(user_response(user))
+
+# Declared before /users/{user_id} so "online" is not taken for a user ID
+@router.get("/users/online", response_model=List[UserResponse])
+async def get_online_users(chat_service: AsyncChatService = Depends(get_chat_service)):
+    """Get all online users, from in-memory presence rather than the users table"""
+    users = await chat_service.get_users(list(presence_service.online_users()))
+    return respond([user_response(user) for user in users])
+
+@router.get("/presence/stats")
+async def get_presence_stats():
+    """Get online count and batched flush counters"""
+    return presence_service.get_stats()
 
 @router.get("/users/{user_id}", response_model=UserResponse)
-async def get_user(user_id: str, db: Session = Depends(get_db)):
+async def get_user(user_id: str, chat_service: AsyncChatService = Depends(get_chat_service)):
     """Get user by ID"""
-    chat_service = ChatService(db)
-    user = chat_service.get_user(user_id)
+    user = await chat_service.get_user(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return UserResponse(
-        id=user.id,
-        username=user.username,
-        email=user.email,
-        is_online=user.is_online,
-        last_seen=user.last_seen,
-        created_at=user.created_at
-    )
+    return respond(user_response(user))
 
 @router.put("/users/{user_id}/status")
-async def update_user_status(user_id: str, is_online: bool, db: Session = Depends(get_db)):
-    """Update user online status"""
-    chat_service = ChatService(db)
-    user = chat_service.update_user_status(user_id, is_online)
+async def update_user_status(user_id: str, is_online: bool, chat_service: AsyncChatService = Depends(get_chat_service)):
+    """
+    Update user online status (heartbeat). Recorded in memory; last_seen is
+    written to the database in periodic batches.
+    """
+    user = await chat_service.get_user(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    presence_service.heartbeat(user_id, is_online)
+    
     return {"message": "User status updated", "user_id": user_id, "is_online": is_online}
 
-@router.get("/users/online", response_model=List[UserResponse])
-async def get_online_users(db: Session = Depends(get_db)):
-    """Get all online users"""
-    chat_service = ChatService(db)
-    users = chat_service.get_online_users()
-    return [
-        UserResponse(
-            id=user.id,
-            username=user.username,
-            email=user.email,
-            is_online=user.is_online,
-            last_seen=user.last_seen,
-            created_at=user.created_at
-        ) for user in users
-    ]
+@router.get("/cache/stats")
+async def get_lookup_cache_stats():
+    """Get user/room/membership lookup cache size and hit ratio"""
+    return AsyncChatService.get_cache_stats()
 
 # Room endpoints
 @router.get("/rooms", response_model=List[RoomResponse])
-async def get_all_rooms(db: Session = Depends(get_db)):
+async def get_all_rooms(chat_service: AsyncChatService = Depends(get_chat_service)):
     """Get all rooms"""
-    chat_service = ChatService(db)
-    rooms = chat_service.get_all_rooms()
-    
-    room_responses = []
-    for room in rooms:
-        participants = chat_service.get_room_participants(room.id)
-        participant_responses = [
-            UserResponse(
-                id=p.id,
-                username=p.username,
-                email=p.email,
-                is_online=p.is_online,
-                last_seen=p.last_seen,
-                created_at=p.created_at
-            ) for p in participants
-        ]
-        
-        room_responses.append(RoomResponse(
-            id=room.id,
-            name=room.name,
-            created_by=room.created_by,
-            created_at=room.created_at,
-            last_activity=room.last_activity,
-            participants=participant_responses
-        ))
-    
-    return room_responses
+    rooms = await chat_service.get_all_rooms()
+    
+    return respond([room_response(room) for room in rooms])
 
 @router.post("/rooms", response_model=RoomResponse)
-async def create_room(room_data: RoomCreate, db: Session = Depends(get_db)):
+async def create_room(room_data: RoomCreate, chat_service: AsyncChatService = Depends(get_chat_service)):
     """Create a new chat room"""
-    chat_service = ChatService(db)
-    
     # Validate that creator exists
-    creator = chat_service.get_user(room_data.participant_ids[0] if room_data.participant_ids else None)
+    creator = await chat_service.get_user(room_data.participant_ids[0] if room_data.participant_ids else None)
     if not creator:
         raise HTTPException(status_code=404, detail="Creator not found")
     
-    room = chat_service.create_room(room_data, creator.id)
-    
-    # Get participants for response
-    participants = chat_service.get_room_participants(room.id)
-    participant_responses = [
-        UserResponse(
-            id=p.id,
-            username=p.username,
-            email=p.email,
-            is_online=p.is_online,
-            last_seen=p.last_seen,
-            created_at=p.created_at
-        ) for p in participants
-    ]
+    room = await chat_service.create_room(room_data, creator.id)
     
-    return RoomResponse(
-        id=room.id,
-        name=room.name,
-        created_by=room.created_by,
-        created_at=room.created_at,
-        last_activity=room.last_activity,
-        participants=participant_responses
-    )
+    return respond(room_response(room))
 
 @router.get("/rooms/{room_id}", response_model=RoomResponse)
-async def get_room(room_id: str, db: Session = Depends(get_db)):
+async def get_room(room_id: str, chat_service: AsyncChatService = Depends(get_chat_service)):
     """Get room by ID"""
-    chat_service = ChatService(db)
-    room = chat_service.get_room(room_id)
+    room = await chat_service.get_room(room_id)
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
     
-    participants = chat_service.get_room_participants(room.id)
-    participant_responses = [
-        UserResponse(
-            id=p.id,
-            username=p.username,
-            email=p.email,
-            is_online=p.is_online,
-            last_seen=p.last_seen,
-            created_at=p.created_at
-        ) for p in participants
-    ]
+    return respond(room_response(room))
+
+@router.put("/rooms/{room_id}/retention", response_model=RoomResponse)
+async def set_room_retention(room_id: str, request: RoomRetentionUpdate, chat_service: AsyncChatService = Depends(get_chat_service)):
+    """
+    Set how many days a room's messages stay in the messages table before
+    they move to the compressed archive. null uses MESSAGE_RETENTION_DAYS;
+    0 keeps them forever. Archived messages stay readable as before.
+    """
+    room = await chat_service.set_room_retention(room_id, request.retention_days)
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
     
-    return RoomResponse(
-        id=room.id,
-        name=room.name,
-        created_by=room.created_by,
-        created_at=room.created_at,
-        last_activity=room.last_activity,
-        participants=participant_responses
-    )
+    return respond(room_response(room))
 
 @router.get("/rooms/{room_id}/participants", response_model=List[UserResponse])
-async def get_room_participants(room_id: str, db: Session = Depends(get_db)):
+async def get_room_participants(room_id: str, chat_service: AsyncChatService = Depends(get_chat_service)):
     """Get all participants in a room"""
-    chat_service = ChatService(db)
-    
     # Validate room exists
-    room = chat_service.get_room(room_id)
+    room = await chat_service.get_room(room_id)
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
     
-    participants = chat_service.get_room_participants(room_id)
-    return [
-        UserResponse(
-            id=p.id,
-            username=p.username,
-            email=p.email,
-            is_online=p.is_online,
-            last_seen=p.last_seen,
-            created_at=p.created_at
-        ) for p in participants
-    ]
+    return respond([user_response(p) for p in chat_service.participant_users(room)])
 
 @router.delete("/rooms/{room_id}/participants/{user_id}")
-async def remove_room_participant(room_id: str, user_id: str, db: Session = Depends(get_db)):
+async def remove_room_participant(room_id: str, user_id: str, chat_service: AsyncChatService = Depends(get_chat_service)):
     """Remove a participant from a room"""
-    chat_service = ChatService(db)
-    success = chat_service.remove_user_from_room(room_id, user_id)
+    success = await chat_service.remove_user_from_room(room_id, user_id)
     if not success:
         raise HTTPException(status_code=400, detail="User not in room or room not found")
     
+    room_hub.publish_participant(room_id, user_id, joined=False)
+    
     return {"message": "User removed from room", "room_id": room_id, "user_id": user_id}
 
 @router.get("/users/{user_id}/rooms", response_model=List[RoomResponse])
-async def get_user_rooms(user_id: str, db: Session = Depends(get_db)):
+async def get_user_rooms(user_id: str, chat_service: AsyncChatService = Depends(get_chat_service)):
     """Get all rooms for a user"""
-    chat_service = ChatService(db)
-    rooms = chat_service.get_user_rooms(user_id)
-    
-    room_responses = []
-    for room in rooms:
-        participants = chat_service.get_room_participants(room.id)
-        participant_responses = [
-            UserResponse(
-                id=p.id,
-                username=p.username,
-                email=p.email,
-                is_online=p.is_online,
-                last_seen=p.last_seen,
-                created_at=p.created_at
-            ) for p in participants
-        ]
-        
-        room_responses.append(RoomResponse(
-            id=room.id,
-            name=room.name,
-            created_by=room.created_by,
-            created_at=room.created_at,
-            last_activity=room.last_activity,
-            participants=participant_responses
-        ))
-    
-    return room_responses
+    rooms = await chat_service.get_user_rooms(user_id)
+    
+    return respond([room_response(room) for room in rooms])
 
 @router.post("/rooms/join")
-async def join_room(request: JoinRoomRequest, db: Session = Depends(get_db)):
+async def join_room(request: JoinRoomRequest, chat_service: AsyncChatService = Depends(get_chat_service)):
     """Join a room"""
-    chat_service = ChatService(db)
-    success = chat_service.add_user_to_room(request.room_id, request.user_id)
+    success = await chat_service.add_user_to_room(request.room_id, request.user_id)
     if not success:
         raise HTTPException(status_code=400, detail="User already in room or room not found")
     
+    room_hub.publish_participant(request.room_id, request.user_id, joined=True)
+    
     return {"message": "User joined room", "room_id": request.room_id, "user_id": request.user_id}
 
 @router.post("/rooms/leave")
-async def leave_room(request: LeaveRoomRequest, db: Session = Depends(get_db)):
+async def leave_room(request: LeaveRoomRequest, chat_service: AsyncChatService = Depends(get_chat_service)):
     """Leave a room"""
-    chat_service = ChatService(db)
-    success = chat_service.remove_user_from_room(request.room_id, request.user_id)
+    success = await chat_service.remove_user_from_room(request.room_id, request.user_id)
     if not success:
         raise HTTPException(status_code=400, detail="User not in room")
     
+    room_hub.publish_participant(request.room_id, request.user_id, joined=False)
+    
     return {"message": "User left room", "room_id": request.room_id, "user_id": request.user_id}
 
 # Message endpoints
 @router.post("/messages", response_model=MessageResponse)
-async def create_message(message_data: MessageCreate, sender_id: str, db: Session = Depends(get_db)):
+async def create_message(message_data: MessageCreate, sender_id: str, chat_service: AsyncChatService = Depends(get_chat_service)):
     """Create a new message"""
-    chat_service = ChatService(db)
-    
     # Validate sender exists
-    sender = chat_service.get_user(sender_id)
+    sender = await chat_service.get_user(sender_id)
     if not sender:
         raise HTTPException(status_code=404, detail="Sender not found")
     
     # Validate room exists and sender is in room
-    room = chat_service.get_room(message_data.room_id)
-    if not room:
+    if not await chat_service.room_exists(message_data.room_id):
         raise HTTPException(status_code=404, detail="Room not found")
     
-    if not chat_service.user_in_room(sender_id, message_data.room_id):
+    if not await chat_service.user_in_room(sender_id, message_data.room_id):
         raise HTTPException(status_code=403, detail="Sender not in room")
     
-    message = chat_service.create_message(message_data, sender_id)
+    message = await chat_service.create_message(message_data, sender_id)
+    room_hub.publish_message(message, sender.username)
     
-    return MessageResponse(
-        id=message.id,
-        room_id=message.room_id,
-        sender_id=message.sender_id,
-        sender_username=sender.username,
-        content=message.content,
-        quantum_state=message.quantum_state,
-        teleportation_result=message.teleportation_result,
-        status=message.status,
-        created_at=message.created_at
-    )
+    return respond(message_response(message, sender.username, message.teleportation_result))
+
+@router.post("/messages/bulk", response_model=BulkMessageResponse)
+async def create_messages_bulk(request: BulkMessageCreate, chat_service: AsyncChatService = Depends(get_chat_service)):
+    """
+    Ingest many messages in one transaction (bots, imports). Membership is
+    validated once per sender and room; nothing is written if any check fails.
+    """
+    start = time.perf_counter()
+    try:
+        message_ids = await chat_service.create_messages(request.messages)
+    except ValueError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    elapsed = time.perf_counter() - start
+    
+    rooms = sorted({item.room_id for item in request.messages})
+    for room_id in rooms:
+        room_hub.publish(room_id, {"type": "messages_imported", "room_id": room_id})
+    
+    return respond(BulkMessageResponse(
+        inserted=len(message_ids),
+        message_ids=message_ids,
+        rooms=rooms,
+        elapsed_ms=elapsed * 1000,
+        rows_per_second=len(message_ids) / elapsed if elapsed > 0 else 0.0
+    ))
+
+@router.post("/messages/archive", response_model=ArchiveRunResponse)
+async def archive_messages(chat_service: AsyncChatService = Depends(get_chat_service)):
+    """Apply the retention policy now instead of waiting for the next scheduled run"""
+    start = time.perf_counter()
+    counts = await chat_service.archive_expired_messages()
+    
+    return respond(ArchiveRunResponse(**counts, elapsed_ms=(time.perf_counter() - start) * 1000))
+
+@router.get("/archive/stats")
+async def get_archive_stats(chat_service: AsyncChatService = Depends(get_chat_service)):
+    """Get archived message counts and compression ratio"""
+    return await chat_service.get_archive_stats()
 
 @router.get("/rooms/{room_id}/messages", response_model=List[MessageResponse])
 async def get_room_messages(
     room_id: str, 
-    limit: int = 50, 
-    offset: int = 0, 
-    db: Session = Depends(get_db)
+    response: Response,
+    limit: int = Query(50, ge=1, le=500), 
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    since: Optional[datetime] = None,
+    offset: Optional[int] = Query(
+        None, ge=0, deprecated=True,
+        description="Oldest-first offset paging. Cost grows with offset when archived and hot history overlap in time; use before/after"
+    ), 
+    if_none_match: Optional[str] = Header(None),
+    chat_service: AsyncChatService = Depends(get_chat_service)
 ):
-    """Get messages for a room"""
-    chat_service = ChatService(db)
+    """
+    Get messages for a room, oldest first.
     
-    # Validate room exists
-    room = chat_service.get_room(room_id)
-    if not room:
+    By default returns the newest `limit` messages. Pass a message ID as
+    `before` to page back through older history, or as `after` to fetch
+    newer messages; `since` returns only messages created after a timestamp.
+    `offset` keeps the old oldest-first offset paging (deprecated; see its description).
+    
+    Responses carry an ETag that changes whenever the room's messages do;
+    a matching If-None-Match gets 304 Not Modified without reading messages.
+    """
+    if sum(cursor is not None for cursor in (before, after, since)) > 1:
+        raise HTTPException(status_code=400, detail="Use only one of 'before', 'after' or 'since'")
+    
+    # Timestamps are stored as naive UTC
+    if since is not None and since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    # Validate room exists; its version alone decides whether anything changed
+    version = await chat_service.get_room_version(room_id)
+    if version is None and not await chat_service.room_exists(room_id):
         raise HTTPException(status_code=404, detail="Room not found")
     
-    messages = chat_service.get_room_messages(room_id, limit, offset)
-    
-    message_responses = []
-    for message in messages:
-        sender = chat_service.get_user(message.sender_id)
-        message_responses.append(MessageResponse(
-            id=message.id,
-            room_id=message.room_id,
-            sender_id=message.sender_id,
-            sender_username=sender.username if sender else "Unknown",
-            content=message.content,
-            quantum_state=message.quantum_state,
-            teleportation_result=message.teleportation_result,
-            status=message.status,
-            created_at=message.created_at
-        ))
-    
-    return message_responses
+    headers = {"ETag": room_messages_etag(room_id, version), "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    
+    # Messages and sender usernames come back together from one joined query
+    if offset is not None and not (before or after or since):
+        rows = await chat_service.get_room_messages_with_senders(room_id, limit, offset)
+    else:
+        try:
+            rows = await chat_service.get_room_messages_page(room_id, limit, before_id=before, after_id=after, since=since)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    teleportation_results = await chat_service.expand_teleportation_results([message for message, _ in rows])
+    
+    return respond([
+        message_response(message, sender_username, teleportation_result)
+        for (message, sender_username), teleportation_result in zip(rows, teleportation_results)
+    ], headers=headers)
+
+async def run_search(
+    chat_service: AsyncChatService,
+    q: str,
+    limit: int,
+    offset: int,
+    room_id: Optional[str] = None,
+    user_id: Optional[str] = None
+) -> List[MessageSearchResult]:
+    """Run a full-text search and build its results"""
+    if not await chat_service.search_available():
+        raise HTTPException(status_code=501, detail="Message search requires SQLite with FTS5")
+    try:
+        matches = await chat_service.search_messages(q, room_id=room_id, user_id=user_id, limit=limit, offset=offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    teleportation_results = await chat_service.expand_teleportation_results([message for message, _, _, _ in matches])
+    
+    return [
+        MessageSearchResult(
+            **message_response(message, sender_username, teleportation_result).model_dump(),
+            score=score,
+            snippet=snippet
+        )
+        for (message, sender_username, score, snippet), teleportation_result in zip(matches, teleportation_results)
+    ]
+
+@router.get("/rooms/{room_id}/messages/search", response_model=List[MessageSearchResult])
+async def search_room_messages(
+    room_id: str,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    chat_service: AsyncChatService = Depends(get_chat_service)
+):
+    """
+    Full-text search over a room's messages, including archived ones, best
+    match first. Every word in `q` must match; end a word with * to match
+    it as a prefix. Page with limit/offset.
+    """
+    if not await chat_service.room_exists(room_id):
+        raise HTTPException(status_code=404, detail="Room not found")
+    
+    return respond(await run_search(chat_service, q, limit, offset, room_id=room_id))
+
+# Declared before /messages/{message_id} so "search" is not taken for a message ID
+@router.get("/messages/search", response_model=List[MessageSearchResult])
+async def search_messages(
+    q: str = Query(..., min_length=1, max_length=200),
+    user_id: str = Query(...),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    chat_service: AsyncChatService = Depends(get_chat_service)
+):
+    """Full-text search across every room the user belongs to, best match first"""
+    if not await chat_service.get_user(user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    return respond(await run_search(chat_service, q, limit, offset, user_id=user_id))
 
 @router.get("/messages/{message_id}", response_model=MessageResponse)
-async def get_message(message_id: str, db: Session = Depends(get_db)):
+async def get_message(message_id: str, chat_service: AsyncChatService = Depends(get_chat_service)):
     """Get message by ID"""
-    chat_service = ChatService(db)
-    message = chat_service.get_message(message_id)
-    if not message:
+    row = await chat_service.get_message_with_sender(message_id)
+    if not row:
         raise HTTPException(status_code=404, detail="Message not found")
     
-    sender = chat_service.get_user(message.sender_id)
-    return MessageResponse(
-        id=message.id,
-        room_id=message.room_id,
-        sender_id=message.sender_id,
-        sender_username=sender.username if sender else "Unknown",
-        content=message.content,
-        quantum_state=message.quantum_state,
-        teleportation_result=message.teleportation_result,
-        status=message.status,
-        created_at=message.created_at
-    )
+    message, sender_username = row
+    teleportation_result = (await chat_service.expand_teleportation_results([message]))[0]
+    return respond(message_response(message, sender_username, teleportation_result))
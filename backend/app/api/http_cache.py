@@ -0,0 +1,19 @@
+from typing import Optional
+from datetime import datetime
+import hashlib
+
+def make_etag(data: bytes) -> str:
+    """Strong ETag for a response body or version key"""
+    return f'"{hashlib.sha256(data).hexdigest()[:32]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison is the rule for If-None-Match
+    return "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+def room_messages_etag(room_id: str, version: Optional[datetime]) -> str:
+    """ETag for a room's message history at a given version"""
+    return make_etag(f"{room_id}|{version.isoformat() if version else ''}".encode("utf-8"))
@@ -1,51 +1,85 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
+from fastapi.encoders import jsonable_encoder
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime
+import asyncio
+import json
+import time
 
-from app.database.session import get_db
 from app.services.quantum_service import QuantumTeleportationService
-from app.services.chat_service import ChatService
-from app.schemas.quantum import QuantumTeleportRequest, QuantumTeleportResponse, QuantumError
+from app.services.quantum_executor import QuantumExecutor, SimulatorQueueFull
+from app.services.async_chat_service import AsyncChatService, get_chat_service
+from app.services.room_hub import room_hub
+from app.api.serialization import respond
+from app.api.http_cache import etag_matches, make_etag
+from app.schemas.quantum import (
+    QuantumTeleportRequest, QuantumTeleportResponse, QuantumError,
+    QuantumTeleportBatchRequest, QuantumTeleportBatchResponse,
+    FidelitySweepRequest, FidelitySweepResponse
+)
 from app.schemas.chat import MessageCreate
+from app.models.database import User
 from app.core.config import settings
 
 router = APIRouter(prefix="/quantum", tags=["quantum"])
 
-# Initialize quantum service
+# Initialize quantum service (cheap: Qiskit is only imported on first use or warm-up)
 quantum_service = QuantumTeleportationService(
     simulator_name=settings.QUANTUM_SIMULATOR,
     shots=settings.QUANTUM_SHOTS
 )
 
+# Bounded worker pool that runs simulator jobs off the event loop
+quantum_executor = QuantumExecutor(
+    quantum_service,
+    mode=settings.QUANTUM_EXECUTOR,
+    max_workers=settings.QUANTUM_WORKERS,
+    max_queue=settings.QUANTUM_QUEUE_SIZE
+)
+
+def simulator_busy_error(error: SimulatorQueueFull) -> HTTPException:
+    """503 response telling the client when to retry"""
+    return HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={"Retry-After": str(settings.QUANTUM_RETRY_AFTER)}
+    )
+
+async def validate_teleport_participants(chat_service: AsyncChatService, sender_id: str, receiver_id: str, room_id: str) -> User:
+    """
+    Validate that sender, receiver and room exist and both users are in the room.
+    Raises HTTPException on the first failed check; returns the sender.
+    """
+    # Validate users exist
+    sender = await chat_service.get_user(sender_id)
+    receiver = await chat_service.get_user(receiver_id)
+    
+    if not sender:
+        raise HTTPException(status_code=404, detail="Sender not found")
+    if not receiver:
+        raise HTTPException(status_code=404, detail="Receiver not found")
+    
+    # Validate room exists and users are in it
+    if not await chat_service.room_exists(room_id):
+        raise HTTPException(status_code=404, detail="Room not found")
+    
+    if not await chat_service.user_in_room(sender_id, room_id):
+        raise HTTPException(status_code=403, detail="Sender not in room")
+    if not await chat_service.user_in_room(receiver_id, room_id):
+        raise HTTPException(status_code=403, detail="Receiver not in room")
+    
+    return sender
+
 @router.post("/teleport", response_model=QuantumTeleportResponse)
-async def teleport_bit(request: QuantumTeleportRequest, db: Session = Depends(get_db)):
+async def teleport_bit(request: QuantumTeleportRequest, chat_service: AsyncChatService = Depends(get_chat_service)):
     """
     Perform quantum teleportation of a classical bit between users.
     """
     try:
-        # Validate users exist
-        chat_service = ChatService(db)
-        sender = chat_service.get_user(request.sender_id)
-        receiver = chat_service.get_user(request.receiver_id)
-        
-        if not sender:
-            raise HTTPException(status_code=404, detail="Sender not found")
-        if not receiver:
-            raise HTTPException(status_code=404, detail="Receiver not found")
-        
-        # Validate room exists and users are in it
-        room = chat_service.get_room(request.room_id)
-        if not room:
-            raise HTTPException(status_code=404, detail="Room not found")
-        
-        if not chat_service.user_in_room(request.sender_id, request.room_id):
-            raise HTTPException(status_code=403, detail="Sender not in room")
-        if not chat_service.user_in_room(request.receiver_id, request.room_id):
-            raise HTTPException(status_code=403, detail="Receiver not in room")
+        sender = await validate_teleport_participants(chat_service, request.sender_id, request.receiver_id, request.room_id)
         
         # Perform quantum teleportation
-        teleportation_result = quantum_service.execute_teleportation(request.classical_bit)
+        teleportation_result = await quantum_executor.run("execute_teleportation", request.classical_bit)
         
         # Create message in database
         message_data = MessageCreate(
@@ -54,19 +88,15 @@ async def teleport_bit(request: QuantumTeleportRequest, db: Session = Depends(ge
             quantum_state=str(request.classical_bit)
         )
         
-        message = chat_service.create_message(
+        # Message, result and room activity are written in one transaction
+        message = await chat_service.create_teleported_message(
             message_data=message_data,
-            sender_id=request.sender_id
-        )
-        
-        # Update message with teleportation result
-        chat_service.update_message_status(
-            message_id=message.id,
-            status="teleported",
+            sender_id=request.sender_id,
             teleportation_result=teleportation_result
         )
+        room_hub.publish_message(message, sender.username, teleportation_result)
         
-        return QuantumTeleportResponse(
+        return respond(QuantumTeleportResponse(
             success=teleportation_result["success"],
             sender_id=request.sender_id,
             receiver_id=request.receiver_id,
@@ -77,46 +107,220 @@ async def teleport_bit(request: QuantumTeleportRequest, db: Session = Depends(ge
             teleportation_data=teleportation_result["teleportation_data"],
             timestamp=datetime.utcnow(),
             message_id=message.id
+        ))
+        
+    except HTTPException:
+        raise
+    except SimulatorQueueFull as e:
+        raise simulator_busy_error(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Quantum teleportation failed: {str(e)}")
+
+@router.post("/teleport/batch", response_model=QuantumTeleportBatchResponse)
+async def teleport_batch(request: QuantumTeleportBatchRequest, chat_service: AsyncChatService = Depends(get_chat_service)):
+    """
+    Teleport a multi-bit payload in one simulator pass, stored as a single message.
+    """
+    try:
+        sender = await validate_teleport_participants(chat_service, request.sender_id, request.receiver_id, request.room_id)
+        
+        # Perform quantum teleportation of every bit at once
+        bits = request.to_bits()
+        teleportation_result = await quantum_executor.run("execute_batch_teleportation", bits)
+        
+        # Create one message for the whole payload
+        message_data = MessageCreate(
+            room_id=request.room_id,
+            content=request.message_content or request.text or f"Teleported bits: {teleportation_result['sent_bits']}",
+            quantum_state=teleportation_result["sent_bits"]
         )
         
+        # Message, result and room activity are written in one transaction
+        message = await chat_service.create_teleported_message(
+            message_data=message_data,
+            sender_id=request.sender_id,
+            teleportation_result=teleportation_result
+        )
+        room_hub.publish_message(message, sender.username, teleportation_result)
+        
+        return respond(QuantumTeleportBatchResponse(
+            success=teleportation_result["success"],
+            sender_id=request.sender_id,
+            receiver_id=request.receiver_id,
+            bit_count=teleportation_result["bit_count"],
+            sent_bits=teleportation_result["sent_bits"],
+            received_bits=teleportation_result["received_bits"],
+            success_count=teleportation_result["success_count"],
+            classical_bits=teleportation_result["classical_bits"],
+            timestamp=datetime.utcnow(),
+            message_id=message.id
+        ))
+        
+    except HTTPException:
+        raise
+    except SimulatorQueueFull as e:
+        raise simulator_busy_error(e)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Quantum teleportation failed: {str(e)}")
 
+# Pre-rendered circuit responses: (bit, format) -> (JSON body, ETag)
+CIRCUIT_FORMATS = ("text", "gates")
+_circuit_responses: Dict[Tuple[int, str], Tuple[bytes, str]] = {}
+
+def render_circuit_response(bit: int, fmt: str) -> Tuple[bytes, str]:
+    """
+    Render the circuit endpoint body for one bit and format, with a strong ETag.
+    The body only depends on the bit, so each combination is rendered once.
+    """
+    cached = _circuit_responses.get((bit, fmt))
+    if cached is not None:
+        return cached
+    
+    if fmt == "gates":
+        content = {
+            "bit": bit,
+            "format": "gates",
+            "circuit": quantum_service.get_circuit_gate_list(bit),
+            "description": f"Quantum teleportation circuit for bit {bit}"
+        }
+    else:
+        content = {
+            "bit": bit,
+            "circuit_data": quantum_service.get_circuit_visualization(bit),
+            "description": f"Quantum teleportation circuit for bit {bit}"
+        }
+    
+    body = json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    etag = make_etag(body)
+    _circuit_responses[(bit, fmt)] = (body, etag)
+    return body, etag
+
+def warm_circuit_responses() -> None:
+    """Render every circuit visualization ahead of the first request"""
+    for bit in (0, 1):
+        for fmt in CIRCUIT_FORMATS:
+            render_circuit_response(bit, fmt)
+
+async def warm_up_quantum() -> Dict[str, Any]:
+    """
+    Load Qiskit, compile the circuits, run a throwaway job and pre-render the
+    circuit responses, all in a worker thread so the event loop keeps serving.
+    """
+    status = await asyncio.to_thread(quantum_service.warm_up)
+    if status["state"] == "ready":
+        await asyncio.to_thread(warm_circuit_responses)
+    return status
+
 @router.get("/circuit/{bit}")
-async def get_circuit_visualization(bit: int):
+async def get_circuit_visualization(
+    bit: int,
+    format: str = "text",
+    if_none_match: Optional[str] = Header(None)
+):
     """
     Get quantum circuit visualization for teleporting a specific bit.
+    format=gates returns a compact JSON gate list instead of the text diagram.
+    Responses carry an ETag; a matching If-None-Match gets 304 Not Modified.
     """
     try:
         if bit not in (0, 1):
             raise HTTPException(status_code=400, detail="Bit must be 0 or 1")
+        if format not in CIRCUIT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Format must be one of: {', '.join(CIRCUIT_FORMATS)}")
         
-        circuit_data = quantum_service.get_circuit_visualization(bit)
-        return {
-            "bit": bit,
-            "circuit_data": circuit_data,
-            "description": f"Quantum teleportation circuit for bit {bit}"
+        body, etag = render_circuit_response(bit, format)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={settings.CIRCUIT_CACHE_MAX_AGE}"
         }
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        
+        return Response(content=body, media_type="application/json", headers=headers)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate circuit: {str(e)}")
 
+@router.post("/fidelity-sweep", response_model=FidelitySweepResponse)
+async def fidelity_sweep(request: FidelitySweepRequest):
+    """
+    Teleportation fidelity over a grid of depolarizing, amplitude-damping and
+    readout noise parameters, evaluated in vectorized density-matrix passes.
+    """
+    try:
+        if request.points > settings.QUANTUM_MAX_SWEEP_POINTS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Grid has {request.points} points; the maximum is {settings.QUANTUM_MAX_SWEEP_POINTS}"
+            )
+        # Readout error is applied analytically; the other two axes are simulated
+        if request.slices > settings.QUANTUM_MAX_SWEEP_SLICES:
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    f"Depolarizing x amplitude damping grid needs {request.slices} simulated density matrices; "
+                    f"the maximum is {settings.QUANTUM_MAX_SWEEP_SLICES}"
+                )
+            )
+        
+        start = time.perf_counter()
+        result = await quantum_executor.run(
+            "fidelity_sweep",
+            request.depolarizing,
+            request.amplitude_damping,
+            request.readout_error
+        )
+        result["elapsed_ms"] = (time.perf_counter() - start) * 1000
+        return result
+        
+    except HTTPException:
+        raise
+    except SimulatorQueueFull as e:
+        raise simulator_busy_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Fidelity sweep failed: {str(e)}")
+
+@router.get("/cache/stats")
+async def get_circuit_cache_stats():
+    """
+    Get hit/miss counters for the compiled teleportation circuit cache.
+    """
+    return quantum_service.get_cache_stats()
+
+@router.get("/executor/stats")
+async def get_executor_stats():
+    """
+    Get simulator worker pool queue depth and wait time metrics.
+    """
+    return quantum_executor.get_stats()
+
 @router.post("/simulate")
-async def simulate_teleportation(bit: int):
+async def simulate_teleportation(bit: int, shots: Optional[int] = None):
     """
     Simulate quantum teleportation without storing in database.
+    With shots > 1 the result includes counts and success-rate statistics.
     """
     try:
         if bit not in (0, 1):
             raise HTTPException(status_code=400, detail="Bit must be 0 or 1")
+        if shots is not None and not 1 <= shots <= settings.QUANTUM_MAX_SHOTS:
+            raise HTTPException(status_code=400, detail=f"Shots must be between 1 and {settings.QUANTUM_MAX_SHOTS}")
         
-        result = quantum_service.execute_teleportation(bit)
+        result = await quantum_executor.run("execute_teleportation", bit, shots=shots)
         return {
             "simulation": True,
             "result": result
         }
         
+    except HTTPException:
+        raise
+    except SimulatorQueueFull as e:
+        raise simulator_busy_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Simulation failed: {str(e)}")
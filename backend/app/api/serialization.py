@@ -0,0 +1,33 @@
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel
+from typing import Dict, List, Optional, Union
+
+from app.core.config import settings
+
+try:
+    import orjson  # noqa: F401
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Fast path: validate response models once and encode them with orjson
+FAST_JSON = settings.FAST_JSON_RESPONSES and ORJSON_AVAILABLE
+
+# Default response class for the app
+DefaultResponse = ORJSONResponse if FAST_JSON else JSONResponse
+
+def respond(content: Union[BaseModel, List[BaseModel]], headers: Optional[Dict[str, str]] = None):
+    """
+    Return already-validated response models from a route.
+
+    On the fast path they are dumped once and encoded with orjson, skipping
+    FastAPI's second validation against response_model and its
+    jsonable_encoder pass. Otherwise they are returned unchanged and
+    FastAPI serializes them as usual; routes passing `headers` must then
+    also set them on their injected Response.
+    """
+    if not FAST_JSON:
+        return content
+    if isinstance(content, list):
+        return ORJSONResponse([item.model_dump() for item in content], headers=headers)
+    return ORJSONResponse(content.model_dump(), headers=headers)
@@ -0,0 +1,62 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+import asyncio
+
+from app.services.async_chat_service import chat_service_scope
+from app.services.room_hub import room_hub, RoomSubscription, CLOSE
+
+router = APIRouter(prefix="/ws", tags=["realtime"])
+
+# Close code sent to clients that fall too far behind (RFC 6455 "try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+async def forward_events(websocket: WebSocket, subscription: RoomSubscription) -> None:
+    """Send queued room events to the client until it is dropped as too slow"""
+    while True:
+        event = await subscription.queue.get()
+        if event is CLOSE:
+            await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE, reason="Client too slow")
+            return
+        await websocket.send_json(event)
+
+async def drain_client(websocket: WebSocket) -> None:
+    """Read and discard client frames (e.g. keep-alive pings) until it disconnects"""
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+@router.websocket("/rooms/{room_id}")
+async def room_events(websocket: WebSocket, room_id: str):
+    """
+    Push a room's new messages and participant joins/leaves as JSON events:
+
+        {"type": "message", "message": {...}}
+        {"type": "participant_joined" | "participant_left", "room_id": ..., "user_id": ...}
+        {"type": "messages_imported", "room_id": ...}  (bulk ingest; refetch the history)
+
+    Replaces polling the messages and participants endpoints.
+    """
+    async with chat_service_scope() as chat_service:
+        room_exists = await chat_service.room_exists(room_id)
+    if not room_exists:
+        await websocket.close(code=1008, reason="Room not found")
+        return
+
+    await websocket.accept()
+    subscription = room_hub.subscribe(room_id)
+    await websocket.send_json({"type": "subscribed", "room_id": room_id})
+
+    sender = asyncio.create_task(forward_events(websocket, subscription))
+    receiver = asyncio.create_task(drain_client(websocket))
+    try:
+        await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        room_hub.unsubscribe(subscription)
+        for task in (sender, receiver):
+            task.cancel()
+
+@router.get("/stats")
+async def get_hub_stats():
+    """Get WebSocket subscriber counts and delivery counters"""
+    return room_hub.get_stats()
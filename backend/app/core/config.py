@@ -28,7 +28,22 @@ class Settings(BaseSettings):
     ]
     
     # Database Configuration
-    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./entangleme.db")
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./entangleme.db")  # aiosqlite/asyncpg drivers enable async routes
+    LOOKUP_CACHE_SIZE: int = 10000  # Cached user/room/membership lookups per process
+    LOOKUP_CACHE_TTL: float = 60.0  # Seconds before a cached lookup is re-read
+    
+    # SQLite tuning, applied to every new connection
+    SQLITE_JOURNAL_MODE: str = "WAL"  # WAL lets readers run alongside a writer
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # Durable with WAL; FULL fsyncs on every commit
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # Wait for locks instead of failing with "database is locked"
+    SQLITE_CACHE_SIZE_KB: int = 65536  # Page cache per connection
+    SQLITE_MMAP_SIZE: int = 268435456  # Bytes of the file memory-mapped for reads (0 disables)
+    
+    # Connection pool for server databases (PostgreSQL etc.)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a pooled connection is replaced
+    DB_POOL_PRE_PING: bool = True  # Test connections before handing them out
     
     # Redis Configuration
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379")
@@ -39,8 +54,39 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
     # Quantum Configuration
-    QUANTUM_SIMULATOR: str = "qasm_simulator"
+    QUANTUM_SIMULATOR: str = "qasm_simulator"  # Aer backend name, or "numpy_statevector"
     QUANTUM_SHOTS: int = 1
+    QUANTUM_MAX_SHOTS: int = 1_000_000  # Upper bound for per-request shots on /quantum/simulate
+    QUANTUM_MAX_SWEEP_POINTS: int = 100_000  # Upper bound for /quantum/fidelity-sweep grid size
+    QUANTUM_MAX_SWEEP_SLICES: int = 20_000  # Upper bound for simulated density matrices (2 x depolarizing x damping)
+    
+    # Simulator worker pool (keeps simulator jobs off the event loop)
+    QUANTUM_EXECUTOR: str = "thread"  # "thread" or "process"
+    QUANTUM_WORKERS: int = 2
+    QUANTUM_QUEUE_SIZE: int = 32  # Jobs allowed to wait for a worker before returning 503
+    QUANTUM_RETRY_AFTER: int = 1  # Seconds, sent as Retry-After on 503
+    QUANTUM_WARMUP: bool = True  # Load Qiskit and run a throwaway job at startup
+    QUANTUM_WARMUP_BACKGROUND: bool = True  # Warm up without delaying startup; see /ready
+    CIRCUIT_CACHE_MAX_AGE: int = 86400  # Seconds clients may cache /quantum/circuit responses
+    
+    # Online presence
+    PRESENCE_TTL: float = 60.0  # Seconds without a heartbeat before a user counts as offline
+    PRESENCE_FLUSH_INTERVAL: float = 10.0  # Seconds between batched last_seen writes
+    
+    # Message retention: older messages move to compressed archive batches
+    MESSAGE_RETENTION_DAYS: int = 0  # Default for rooms without their own retention_days (0 keeps messages forever)
+    MESSAGE_ARCHIVE_BATCH_SIZE: int = 1000  # Messages per compressed archive batch
+    MESSAGE_ARCHIVE_INTERVAL: float = 3600.0  # Seconds between retention runs
+    MESSAGE_ARCHIVE_CACHE_BATCHES: int = 32  # Decompressed archive batches kept in memory for reads
+    
+    # Database status
+    DB_STATS_REFRESH_INTERVAL: float = 30.0  # Seconds between /db-status row count refreshes
+    
+    # Responses
+    FAST_JSON_RESPONSES: bool = False  # Validate response models once and encode with orjson
+    
+    # Realtime room events
+    WS_SEND_QUEUE_SIZE: int = 100  # Events queued per WebSocket before the client is dropped as too slow
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,131 @@
+# Data migrations for existing databases
+# Run with: python -m app.database.migrations
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+
+from app.database.session import SessionLocal, engine
+from app.models.database import Base, Message
+from app.services.teleportation_storage import TeleportationResultStore, is_compact
+from app.services.message_search import MessageSearchIndex, create_search_index, SEARCH_TABLE
+
+def dedupe_room_participants(conn: Connection) -> int:
+    """Delete duplicate (room_id, user_id) memberships, keeping one row of each"""
+    result = conn.execute(text("""
+        DELETE FROM room_participants
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM room_participants GROUP BY room_id, user_id
+        )
+    """))
+    return result.rowcount
+
+# Cleanups that must run before a unique index can be created on old data
+_BEFORE_UNIQUE_INDEX = {
+    "ux_room_participants_room_user": dedupe_room_participants,
+}
+
+def ensure_columns(bind: Engine) -> List[str]:
+    """
+    Add nullable columns declared on the models that are missing from existing
+    tables, which create_all does not do. Returns "table.column" for each added.
+    """
+    added = []
+    existing_tables = set(inspect(bind).get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspect(bind).get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=bind.dialect)
+            with bind.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            added.append(f"{table.name}.{column.name}")
+    return added
+
+def ensure_indexes(bind: Engine) -> List[str]:
+    """
+    Create indexes declared on the models that are missing from existing tables.
+    create_all only creates indexes together with new tables, so databases
+    created by older versions need this. Returns the names of created indexes.
+    """
+    created = []
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            with bind.begin() as conn:
+                if not bind.dialect.has_index(conn, table.name, index.name):
+                    if index.name in _BEFORE_UNIQUE_INDEX:
+                        _BEFORE_UNIQUE_INDEX[index.name](conn)
+                    index.create(conn)
+                    created.append(index.name)
+    return created
+
+def ensure_search_index(bind: Engine) -> Optional[int]:
+    """
+    Create the message search index if it is missing and index all existing
+    messages, hot and archived. Returns the number of messages indexed, or
+    None if the index already existed or FTS5 is unavailable.
+    """
+    existed = SEARCH_TABLE in inspect(bind).get_table_names()
+    with bind.begin() as conn:
+        if not create_search_index(conn) or existed:
+            return None
+    db = SessionLocal()
+    try:
+        return MessageSearchIndex(db).rebuild()
+    finally:
+        db.close()
+
+def compact_teleportation_results(db: Session, batch_size: int = 500) -> Dict[str, int]:
+    """
+    Rewrite full-format Message.teleportation_result rows in the compact
+    template-based format. Safe to re-run: compact rows are left alone.
+    """
+    store = TeleportationResultStore(db)
+    counts = {"converted": 0, "already_compact": 0, "unchanged": 0}
+    last_id = ""
+    
+    while True:
+        # Walk the table by primary key so each batch is a short transaction
+        messages = db.query(Message).filter(
+            Message.teleportation_result.isnot(None),
+            Message.id > last_id
+        ).order_by(Message.id).limit(batch_size).all()
+        if not messages:
+            break
+        
+        for message in messages:
+            if is_compact(message.teleportation_result):
+                counts["already_compact"] += 1
+                continue
+            compact = store.compact(message.teleportation_result)
+            if is_compact(compact):
+                message.teleportation_result = compact
+                counts["converted"] += 1
+            else:
+                counts["unchanged"] += 1
+        
+        db.commit()
+        last_id = messages[-1].id
+    
+    return counts
+
+if __name__ == "__main__":
+    Base.metadata.create_all(bind=engine)
+    for column_name in ensure_columns(engine):
+        print(f"✅ Added column {column_name}")
+    for index_name in ensure_indexes(engine):
+        print(f"✅ Created index {index_name}")
+    indexed = ensure_search_index(engine)
+    if indexed is not None:
+        print(f"✅ Created search index ({indexed} messages)")
+    db = SessionLocal()
+    try:
+        print("🔄 Compacting stored teleportation results...")
+        counts = compact_teleportation_results(db)
+        print(f"✅ Converted: {counts['converted']}, already compact: {counts['already_compact']}, "
+              f"left unchanged: {counts['unchanged']}")
+    finally:
+        db.close()
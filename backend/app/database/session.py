@@ -1,16 +1,119 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Connection, Engine, make_url
 from sqlalchemy.orm import sessionmaker
+from typing import Any, Dict, Optional
 from app.core.config import settings
 
-# Create database engine
+# Async drivers and the sync driver used for the same database
+ASYNC_DRIVERS = {
+    "sqlite+aiosqlite": "sqlite",
+    "postgresql+asyncpg": "postgresql"
+}
+
+def is_async_database_url(url: str) -> bool:
+    """Check whether a database URL names an async driver"""
+    return make_url(url).drivername in ASYNC_DRIVERS
+
+def sync_database_url(url: str) -> str:
+    """The same database URL with its async driver swapped for the sync one"""
+    parsed = make_url(url)
+    if parsed.drivername in ASYNC_DRIVERS:
+        parsed = parsed.set(drivername=ASYNC_DRIVERS[parsed.drivername])
+    return parsed.render_as_string(hide_password=False)
+
+IS_SQLITE = make_url(settings.DATABASE_URL).get_backend_name() == "sqlite"
+
+SQLITE_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SQLITE_SYNCHRONOUS_MODES = {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"}
+
+def sqlite_pragmas() -> Dict[str, Any]:
+    """PRAGMAs applied to each new SQLite connection, from settings"""
+    journal_mode = settings.SQLITE_JOURNAL_MODE.upper()
+    synchronous = settings.SQLITE_SYNCHRONOUS.upper()
+    if journal_mode not in SQLITE_JOURNAL_MODES:
+        raise ValueError(f"Invalid SQLITE_JOURNAL_MODE: {settings.SQLITE_JOURNAL_MODE}")
+    if synchronous not in SQLITE_SYNCHRONOUS_MODES.values():
+        raise ValueError(f"Invalid SQLITE_SYNCHRONOUS: {settings.SQLITE_SYNCHRONOUS}")
+    return {
+        "journal_mode": journal_mode,
+        "synchronous": synchronous,
+        "busy_timeout": int(settings.SQLITE_BUSY_TIMEOUT_MS),
+        # Negative cache_size is in KiB rather than pages
+        "cache_size": -int(settings.SQLITE_CACHE_SIZE_KB),
+        "mmap_size": int(settings.SQLITE_MMAP_SIZE)
+    }
+
+def engine_options() -> Dict[str, Any]:
+    """create_engine keyword arguments for the configured database"""
+    if IS_SQLITE:
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING
+    }
+
+def configure_sqlite(sync_engine: Engine) -> None:
+    """Apply the SQLite PRAGMAs whenever the engine opens a connection"""
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+# Create database engine (always sync: used by scripts, migrations and table creation)
 engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+    sync_database_url(settings.DATABASE_URL),
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},
+    **engine_options()
 )
+if IS_SQLITE:
+    configure_sqlite(engine)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the API routes, when DATABASE_URL names an async driver
+# (sqlite+aiosqlite://... or postgresql+asyncpg://...)
+async_engine = None
+AsyncSessionLocal = None
+if is_async_database_url(settings.DATABASE_URL):
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(settings.DATABASE_URL, **engine_options())
+    if IS_SQLITE:
+        configure_sqlite(async_engine.sync_engine)
+    # Objects stay usable after commit; reloading them would need the event loop
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def get_engine_settings(conn: Optional[Connection] = None) -> Dict[str, Any]:
+    """
+    Effective engine settings. SQLite PRAGMAs are read back from a live
+    connection (`conn`, or a new one), so a value the database did not
+    accept (e.g. WAL on an in-memory database) shows what is really in effect.
+    """
+    info: Dict[str, Any] = {
+        "dialect": engine.dialect.name,
+        "async_routes": async_engine is not None,
+        "pool": {"class": type(engine.pool).__name__, "status": engine.pool.status()}
+    }
+    if IS_SQLITE:
+        if conn is None:
+            with engine.connect() as conn:
+                return get_engine_settings(conn)
+        pragmas = {name: conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in sqlite_pragmas()}
+        pragmas["synchronous"] = SQLITE_SYNCHRONOUS_MODES.get(pragmas["synchronous"], pragmas["synchronous"])
+        info["sqlite"] = pragmas
+    else:
+        info["pool"].update(engine_options())
+    return info
+
 def get_db():
     """Dependency to get database session"""
     db = SessionLocal()
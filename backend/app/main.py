@@ -1,48 +1,121 @@
+import time
+
+# Measure how long the application takes to import, reported at startup
+_IMPORT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, HTMLResponse
 from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 import os
-from sqlalchemy import inspect, text
 from pydantic import BaseModel
 from pathlib import Path
 
 from app.core.config import settings
-from app.api import quantum, chat
-from app.database.session import engine
+from app.api import quantum, chat, ws
+from app.api.serialization import DefaultResponse, FAST_JSON
+from app.database.session import engine, async_engine
 from app.models.database import Base
+from app.services.teleportation_storage import clear_template_cache
+from app.services.cache import lookup_cache
+from app.services.presence import presence_service
+from app.services.db_stats import db_stats
+from app.services.message_archive import archive_batch_cache, run_archive_loop
+from app.database.migrations import ensure_columns, ensure_indexes, ensure_search_index
+from app.services.message_search import drop_search_index
+
+_IMPORT_MS = (time.perf_counter() - _IMPORT_STARTED) * 1000
 
 # Request model for database reset
 class ResetDatabaseRequest(BaseModel):
     confirmation: str
 
+async def run_quantum_warmup():
+    """Warm up the quantum simulator and report its timings"""
+    status = await quantum.warm_up_quantum()
+    if status["state"] == "ready":
+        print(f"✅ Quantum simulator warm: import {status['import_ms']:.0f} ms, "
+              f"compile {status['compile_ms']:.0f} ms, first job {status['first_job_ms']:.1f} ms")
+    else:
+        print(f"⚠️ Quantum simulator warm-up failed: {status['error']}")
+
 # Create database tables
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    print(f"⏱️ App import time: {_IMPORT_MS:.0f} ms")
+    if settings.FAST_JSON_RESPONSES and not FAST_JSON:
+        print("⚠️ FAST_JSON_RESPONSES is set but orjson is not installed; using the standard JSON path")
     Base.metadata.create_all(bind=engine)
+    for column_name in ensure_columns(engine):
+        print(f"✅ Added missing column {column_name}")
+    for index_name in ensure_indexes(engine):
+        print(f"✅ Created missing index {index_name}")
+    indexed = ensure_search_index(engine)
+    if indexed is not None:
+        print(f"✅ Created message search index ({indexed} messages)")
     
     # Reset database in production if RESET_DB environment variable is set
     if os.getenv("RESET_DB", "false").lower() == "true" or os.getenv("ENVIRONMENT") == "production":
         print(" Resetting database for production...")
         try:
             # Drop all tables and recreate them
+            with engine.begin() as conn:
+                drop_search_index(conn)
             Base.metadata.drop_all(bind=engine)
             Base.metadata.create_all(bind=engine)
+            ensure_search_index(engine)
+            clear_template_cache()
+            lookup_cache.clear()
+            presence_service.clear()
+            db_stats.clear()
+            archive_batch_cache.clear()
             print("✅ Database reset completed")
         except Exception as e:
             print(f"⚠️ Database reset failed: {e}")
     
+    # Load Qiskit and compile the circuits before the first teleport request.
+    # In the background, /health answers immediately and /ready reports progress.
+    warmup_task = None
+    if settings.QUANTUM_WARMUP:
+        if settings.QUANTUM_WARMUP_BACKGROUND:
+            warmup_task = asyncio.create_task(run_quantum_warmup())
+        else:
+            await run_quantum_warmup()
+    
+    # Presence starts empty, so nobody is online until they send a heartbeat
+    presence_service.reset_online()
+    
+    # Write heartbeats to the users table in batches
+    presence_task = asyncio.create_task(presence_service.run_flush_loop())
+    
+    # Keep the /db-status row counts fresh off the request path
+    stats_task = asyncio.create_task(db_stats.run_refresh_loop())
+    
+    # Move messages past their retention window into the compressed archive
+    archive_task = asyncio.create_task(run_archive_loop(settings.MESSAGE_ARCHIVE_INTERVAL))
+    
     yield
     # Shutdown
-    pass
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    # Cancelling runs a final flush
+    presence_task.cancel()
+    stats_task.cancel()
+    archive_task.cancel()
+    await asyncio.gather(presence_task, stats_task, archive_task, return_exceptions=True)
+    quantum.quantum_executor.shutdown()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 # Create FastAPI app
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
     description="Quantum Teleportation Chat API - Secure messaging using quantum principles",
+    default_response_class=DefaultResponse,
     lifespan=lifespan
 )
 
@@ -58,6 +131,7 @@ app.add_middleware(
 # Include routers
 app.include_router(quantum.router, prefix=settings.API_V1_STR)
 app.include_router(chat.router, prefix=settings.API_V1_STR)
+app.include_router(ws.router, prefix=settings.API_V1_STR)
 
 # Root endpoint
 @app.get("/")
@@ -69,6 +143,7 @@ async def root():
         "redoc": "/redoc",
         "endpoints": {
             "health": "/health",
+            "ready": "/ready",
             "database_status": "/db-status",
             "reset_database": "/reset-db",
         }
@@ -83,6 +158,19 @@ async def health_check():
         "version": settings.VERSION
     }
 
+# Readiness endpoint - 503 until the quantum simulator is warm
+@app.get("/ready")
+async def readiness_check():
+    warmup = quantum.quantum_service.warmup_status
+    ready = quantum.quantum_service.is_ready or not settings.QUANTUM_WARMUP
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else warmup["state"],
+            "quantum_warmup": warmup
+        }
+    )
+
 # Reset database HTML page endpoint (GET)
 @app.get("/reset-db", response_class=HTMLResponse)
 async def reset_database_page():
@@ -149,10 +237,18 @@ async def reset_database(request: ResetDatabaseRequest):
             )
         
         # Drop all tables
+        with engine.begin() as conn:
+            drop_search_index(conn)
         Base.metadata.drop_all(bind=engine)
         
         # Recreate all tables
         Base.metadata.create_all(bind=engine)
+        ensure_search_index(engine)
+        clear_template_cache()
+        lookup_cache.clear()
+        presence_service.clear()
+        db_stats.clear()
+        archive_batch_cache.clear()
         
         return {
             "status": "success",
@@ -179,7 +275,9 @@ async def reset_database(request: ResetDatabaseRequest):
 @app.get("/db-status")
 async def database_status_endpoint(request: Request):
     """
-    Serve the database status HTML page or JSON data based on Accept header
+    Serve the database status HTML page or JSON data based on Accept header.
+    JSON comes from a snapshot refreshed every DB_STATS_REFRESH_INTERVAL
+    seconds (see age_seconds); ?detail=true refreshes it and adds row samples.
     """
     # Check if the request wants HTML
     accept_header = request.headers.get("accept", "").lower()
@@ -206,91 +304,17 @@ async def database_status_endpoint(request: Request):
                 detail=f"Failed to serve database status page: {str(e)}"
             )
     else:
-        # Serve JSON data
+        # Serve JSON data from the cached stats snapshot; row samples only with ?detail=true
         try:
-            # Check if tables exist
-            inspector = inspect(engine)
-            existing_tables = inspector.get_table_names()
-            
-            # Get actual data from tables
-            table_data = {}
-            table_counts = {}
-            
-            for table in existing_tables:
-                try:
-                    with engine.connect() as conn:
-                        # Get count
-                        count_result = conn.execute(text(f"SELECT COUNT(*) FROM {table}"))
-                        count = count_result.scalar()
-                        table_counts[table] = count
-                        
-                        # Get actual data (limit to 50 records for performance)
-                        if count > 0:
-                            if table == "users":
-                                # Get user data with specific fields
-                                result = conn.execute(text(f"""
-                                    SELECT id, username, email, is_online, last_seen, created_at 
-                                    FROM {table} 
-                                    ORDER BY created_at DESC 
-                                    LIMIT 50
-                                """))
-                                data = [dict(row) for row in result.mappings()]
-                            elif table == "rooms":
-                                # Get room data
-                                result = conn.execute(text(f"""
-                                    SELECT id, name, created_by, created_at, last_activity 
-                                    FROM {table} 
-                                    ORDER BY created_at DESC 
-                                    LIMIT 50
-                                """))
-                                data = [dict(row) for row in result.mappings()]
-                            elif table == "messages":
-                                # Get message data (limit content length using SQLite functions)
-                                result = conn.execute(text(f"""
-                                    SELECT id, room_id, sender_id, 
-                                           CASE 
-                                               WHEN length(content) > 100 THEN substr(content, 1, 100) || '...'
-                                               ELSE content 
-                                           END as content,
-                                           quantum_state, status, created_at 
-                                    FROM {table} 
-                                    ORDER BY created_at DESC 
-                                    LIMIT 50
-                                """))
-                                data = [dict(row) for row in result.mappings()]
-                            elif table == "room_participants":
-                                # Get room participant data
-                                result = conn.execute(text(f"""
-                                    SELECT id, room_id, user_id, joined_at 
-                                    FROM {table} 
-                                    ORDER BY joined_at DESC 
-                                    LIMIT 50
-                                """))
-                                data = [dict(row) for row in result.mappings()]
-                            else:
-                                # Generic data for other tables
-                                result = conn.execute(text(f"SELECT * FROM {table} LIMIT 50"))
-                                data = [dict(row) for row in result.mappings()]
-                            
-                            # Convert datetime objects to strings for JSON serialization
-                            for item in data:
-                                for key, value in item.items():
-                                    if hasattr(value, 'isoformat'):
-                                        item[key] = value.isoformat()
-                            
-                            table_data[table] = data
-                        else:
-                            table_data[table] = []
-                            
-                except Exception as e:
-                    table_counts[table] = f"Error: {str(e)}"
-                    table_data[table] = []
+            if request.query_params.get("detail", "").lower() in ("1", "true", "yes"):
+                stats = await asyncio.to_thread(db_stats.refresh, True)
+            else:
+                # No snapshot yet (startup or just reset): build one off the event loop
+                stats = db_stats.get_snapshot() or await asyncio.to_thread(db_stats.refresh)
             
             return {
                 "status": "healthy",
-                "tables": existing_tables,
-                "table_counts": table_counts,
-                "table_data": table_data,
+                **stats,
                 "database_url": settings.DATABASE_URL.split('/')[-1] if settings.DATABASE_URL else "unknown",
                 "environment": os.getenv("ENVIRONMENT", "development")
             }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON, Index, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -28,9 +28,17 @@ class Room(Base):
     created_by = Column(String, ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
     last_activity = Column(DateTime, default=datetime.utcnow)
+    retention_days = Column(Integer, nullable=True)  # Days before messages are archived; None uses MESSAGE_RETENTION_DAYS, 0 keeps them
     
     # Relationships
-    participants = relationship("RoomParticipant", back_populates="room")
+    # Participants (and their users) are batch-loaded for every room in one
+    # extra query, so listing N rooms never issues N participant queries
+    participants = relationship(
+        "RoomParticipant",
+        back_populates="room",
+        lazy="selectin",
+        order_by="RoomParticipant.joined_at"
+    )
     messages = relationship("Message", back_populates="room")
 
 class RoomParticipant(Base):
@@ -43,7 +51,14 @@ class RoomParticipant(Base):
     
     # Relationships
     room = relationship("Room", back_populates="participants")
-    user = relationship("User", back_populates="room_participants")
+    user = relationship("User", back_populates="room_participants", lazy="joined")
+    
+    __table_args__ = (
+        # One membership per (room, user); also serves user_in_room lookups
+        Index("ux_room_participants_room_user", "room_id", "user_id", unique=True),
+        # get_user_rooms filters by user first
+        Index("ix_room_participants_user_room", "user_id", "room_id"),
+    )
 
 class Message(Base):
     __tablename__ = "messages"
@@ -53,10 +68,49 @@ class Message(Base):
     sender_id = Column(String, ForeignKey("users.id"))
     content = Column(Text, nullable=False)
     quantum_state = Column(String, nullable=True)  # "0" or "1"
-    teleportation_result = Column(JSON, nullable=True)  # Store quantum teleportation data
+    teleportation_result = Column(JSON, nullable=True)  # Store quantum teleportation data (compact format, see teleportation_storage)
     status = Column(String, default="sent")  # sent, teleported, failed
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     room = relationship("Room", back_populates="messages")
     sender = relationship("User", back_populates="messages")
+    
+    __table_args__ = (
+        # Keyset pagination of a room's history seeks and scans this index in order
+        Index("ix_messages_room_created_id", "room_id", "created_at", "id"),
+    )
+
+class MessageArchive(Base):
+    __tablename__ = "message_archives"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    room_id = Column(String, ForeignKey("rooms.id"), nullable=False)
+    # Range of (created_at, id) keys in the batch; batches of a room may overlap
+    first_created_at = Column(DateTime, nullable=False)
+    last_created_at = Column(DateTime, nullable=False)
+    message_count = Column(Integer, nullable=False)
+    raw_size = Column(Integer, nullable=False)  # Bytes of JSON before compression
+    payload = Column(LargeBinary, nullable=False)  # zlib-compressed JSON list of messages, oldest first
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Reading history walks a room's batches by either end of their range
+        Index("ix_message_archives_room_first", "room_id", "first_created_at"),
+        Index("ix_message_archives_room_last", "room_id", "last_created_at"),
+    )
+
+class ArchivedMessage(Base):
+    __tablename__ = "archived_messages"
+    
+    # Finds the batch holding an archived message, for lookups and cursors by ID
+    message_id = Column(String, primary_key=True)
+    archive_id = Column(String, ForeignKey("message_archives.id"), nullable=False)
+
+class CircuitTemplate(Base):
+    __tablename__ = "circuit_templates"
+    
+    id = Column(String, primary_key=True)  # Content hash of the template
+    circuit_data = Column(JSON, nullable=False)  # Static circuit description (gates, steps, measurements)
+    circuit_diagram = Column(Text, nullable=False)  # ASCII circuit diagram
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,12 +1,17 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, timezone
+
+# Upper bound on messages per bulk ingest request
+MAX_BULK_MESSAGES = 10000
 
 class UserCreate(BaseModel):
     username: str = Field(..., min_length=1, max_length=50)
     email: Optional[str] = None
 
 class UserResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
     id: str
     username: str
     email: Optional[str]
@@ -24,8 +29,13 @@ class RoomResponse(BaseModel):
     created_by: str
     created_at: datetime
     last_activity: datetime
+    retention_days: Optional[int] = None
     participants: List[UserResponse]
 
+class RoomRetentionUpdate(BaseModel):
+    # Days before messages move to the archive; null uses MESSAGE_RETENTION_DAYS, 0 keeps them
+    retention_days: Optional[int] = Field(None, ge=0)
+
 class MessageCreate(BaseModel):
     room_id: str
     content: str = Field(..., min_length=1)
@@ -42,6 +52,41 @@ class MessageResponse(BaseModel):
     status: str
     created_at: datetime
 
+class MessageSearchResult(MessageResponse):
+    score: float  # BM25 relevance, higher is better
+    snippet: str  # Matching excerpt with terms in [brackets]
+
+class BulkMessageItem(BaseModel):
+    room_id: str
+    sender_id: str
+    content: str = Field(..., min_length=1)
+    quantum_state: Optional[str] = None
+    created_at: Optional[datetime] = Field(None, description="Original timestamp for imports; defaults to now")
+    
+    @field_validator("created_at")
+    @classmethod
+    def to_naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # Timestamps are stored as naive UTC
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+class BulkMessageCreate(BaseModel):
+    messages: List[BulkMessageItem] = Field(..., min_length=1, max_length=MAX_BULK_MESSAGES)
+
+class BulkMessageResponse(BaseModel):
+    inserted: int
+    message_ids: List[str]
+    rooms: List[str]
+    elapsed_ms: float
+    rows_per_second: float
+
+class ArchiveRunResponse(BaseModel):
+    rooms: int
+    messages: int
+    batches: int
+    elapsed_ms: float
+
 class JoinRoomRequest(BaseModel):
     room_id: str
     user_id: str
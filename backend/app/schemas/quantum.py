@@ -1,7 +1,10 @@
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional, Dict, Any, List, Annotated
 from datetime import datetime
 
+# Upper bound on bits per batch teleportation (512 bytes of text)
+MAX_BATCH_BITS = 4096
+
 class QuantumTeleportRequest(BaseModel):
     sender_id: str = Field(..., description="ID of the sender")
     receiver_id: str = Field(..., description="ID of the receiver")
@@ -21,6 +24,65 @@ class QuantumTeleportResponse(BaseModel):
     timestamp: datetime
     message_id: Optional[str] = None
 
+class QuantumTeleportBatchRequest(BaseModel):
+    sender_id: str = Field(..., description="ID of the sender")
+    receiver_id: str = Field(..., description="ID of the receiver")
+    room_id: str = Field(..., description="Room ID where teleportation occurs")
+    bits: Optional[str] = Field(None, pattern=r"^[01]+$", max_length=MAX_BATCH_BITS, description="Bit string to teleport, e.g. \"01000001\"")
+    text: Optional[str] = Field(None, min_length=1, description="Text payload, teleported as its UTF-8 bytes (MSB first)")
+    message_content: Optional[str] = Field(None, description="Optional text message")
+    
+    @model_validator(mode="after")
+    def check_payload(self):
+        if (self.bits is None) == (self.text is None):
+            raise ValueError("Provide exactly one of 'bits' or 'text'")
+        if self.text is not None and len(self.text.encode("utf-8")) * 8 > MAX_BATCH_BITS:
+            raise ValueError(f"Payload exceeds {MAX_BATCH_BITS} bits")
+        return self
+    
+    def to_bits(self) -> List[int]:
+        """Flatten the payload into a list of classical bits"""
+        if self.bits is not None:
+            return [int(bit) for bit in self.bits]
+        return [int(bit) for byte in self.text.encode("utf-8") for bit in format(byte, "08b")]
+
+class QuantumTeleportBatchResponse(BaseModel):
+    success: bool
+    sender_id: str
+    receiver_id: str
+    bit_count: int
+    sent_bits: str
+    received_bits: str
+    success_count: int
+    classical_bits: List[str] = Field(..., description="Measurement results per teleported bit")
+    timestamp: datetime
+    message_id: Optional[str] = None
+
+# A noise parameter (probability) in [0, 1]
+NoiseParameter = Annotated[float, Field(ge=0.0, le=1.0)]
+
+class FidelitySweepRequest(BaseModel):
+    depolarizing: List[NoiseParameter] = Field(default_factory=lambda: [0.0], min_length=1, max_length=1000, description="Depolarizing probabilities per gate and qubit")
+    amplitude_damping: List[NoiseParameter] = Field(default_factory=lambda: [0.0], min_length=1, max_length=1000, description="Amplitude damping gammas per gate and qubit")
+    readout_error: List[NoiseParameter] = Field(default_factory=lambda: [0.0], min_length=1, max_length=1000, description="Symmetric readout flip probabilities")
+    
+    @property
+    def points(self) -> int:
+        return len(self.depolarizing) * len(self.amplitude_damping) * len(self.readout_error)
+    
+    @property
+    def slices(self) -> int:
+        """Density matrices simulated: one per input bit, depolarizing and damping value"""
+        return 2 * len(self.depolarizing) * len(self.amplitude_damping)
+
+class FidelitySweepResponse(BaseModel):
+    grid: Dict[str, List[float]] = Field(..., description="Parameter values along each axis")
+    points: int
+    fidelity: List[List[float]] = Field(..., description="Average fidelity, indexed [depolarizing][amplitude_damping]")
+    fidelity_by_input: Dict[str, List[List[float]]] = Field(..., description="Fidelity per input bit, same indexing")
+    success_probability: List[List[List[float]]] = Field(..., description="Probability of reading the sent bit, indexed [depolarizing][amplitude_damping][readout_error]")
+    elapsed_ms: float
+
 class QuantumCircuitData(BaseModel):
     circuit_diagram: str
     gate_sequence: list
@@ -0,0 +1,167 @@
+from contextlib import asynccontextmanager
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+from datetime import datetime
+
+from app.database import session as database
+from app.models.database import User, Room, Message
+from app.schemas.chat import UserCreate, RoomCreate, MessageCreate, BulkMessageItem
+from app.services.chat_service import ChatService
+
+class AsyncChatService:
+    """
+    Awaitable ChatService for the API routes.
+
+    With an AsyncSession (DATABASE_URL naming aiosqlite or asyncpg) every
+    call runs the ChatService implementation through AsyncSession.run_sync,
+    so SQL I/O awaits on the driver instead of blocking the event loop.
+    With a sync Session calls run inline, exactly as ChatService does.
+    Both paths share one implementation, including cache invalidation.
+    """
+
+    def __init__(self, db: Union[Session, AsyncSession]):
+        self.db = db
+        self._is_async = isinstance(db, AsyncSession)
+        self._service = ChatService(db.sync_session if self._is_async else db)
+
+    async def _run(self, operation: Callable[[ChatService], Any]) -> Any:
+        if self._is_async:
+            return await self.db.run_sync(lambda _: operation(self._service))
+        return operation(self._service)
+
+    # User management
+    async def create_user(self, user_data: UserCreate) -> User:
+        return await self._run(lambda service: service.create_user(user_data))
+
+    async def get_user(self, user_id: str) -> Optional[User]:
+        return await self._run(lambda service: service.get_user(user_id))
+
+    async def get_users(self, user_ids: List[str]) -> List[User]:
+        return await self._run(lambda service: service.get_users(user_ids))
+
+    async def get_user_by_username(self, username: str) -> Optional[User]:
+        return await self._run(lambda service: service.get_user_by_username(username))
+
+    async def update_user_status(self, user_id: str, is_online: bool) -> Optional[User]:
+        return await self._run(lambda service: service.update_user_status(user_id, is_online))
+
+    async def get_online_users(self) -> List[User]:
+        return await self._run(lambda service: service.get_online_users())
+
+    # Room management
+    async def create_room(self, room_data: RoomCreate, created_by: str) -> Room:
+        return await self._run(lambda service: service.create_room(room_data, created_by))
+
+    async def get_room(self, room_id: str) -> Optional[Room]:
+        return await self._run(lambda service: service.get_room(room_id))
+
+    async def room_exists(self, room_id: str) -> bool:
+        return await self._run(lambda service: service.room_exists(room_id))
+
+    async def get_room_version(self, room_id: str) -> Optional[datetime]:
+        return await self._run(lambda service: service.get_room_version(room_id))
+
+    async def set_room_retention(self, room_id: str, retention_days: Optional[int]) -> Optional[Room]:
+        return await self._run(lambda service: service.set_room_retention(room_id, retention_days))
+
+    async def get_user_rooms(self, user_id: str) -> List[Room]:
+        return await self._run(lambda service: service.get_user_rooms(user_id))
+
+    async def get_all_rooms(self) -> List[Room]:
+        return await self._run(lambda service: service.get_all_rooms())
+
+    async def add_user_to_room(self, room_id: str, user_id: str) -> bool:
+        return await self._run(lambda service: service.add_user_to_room(room_id, user_id))
+
+    async def remove_user_from_room(self, room_id: str, user_id: str) -> bool:
+        return await self._run(lambda service: service.remove_user_from_room(room_id, user_id))
+
+    async def get_room_participants(self, room_id: str) -> List[User]:
+        return await self._run(lambda service: service.get_room_participants(room_id))
+
+    participant_users = staticmethod(ChatService.participant_users)
+
+    # Message management
+    async def create_message(self, message_data: MessageCreate, sender_id: str) -> Message:
+        return await self._run(lambda service: service.create_message(message_data, sender_id))
+
+    async def create_teleported_message(self, message_data: MessageCreate, sender_id: str, teleportation_result: Dict) -> Message:
+        return await self._run(lambda service: service.create_teleported_message(message_data, sender_id, teleportation_result))
+
+    async def create_messages(self, items: List[BulkMessageItem]) -> List[str]:
+        return await self._run(lambda service: service.create_messages(items))
+
+    async def get_room_messages(self, room_id: str, limit: int = 50, offset: int = 0) -> List[Message]:
+        return await self._run(lambda service: service.get_room_messages(room_id, limit, offset))
+
+    async def get_room_messages_with_senders(self, room_id: str, limit: int = 50, offset: int = 0) -> List[Tuple[Message, Optional[str]]]:
+        return await self._run(lambda service: service.get_room_messages_with_senders(room_id, limit, offset))
+
+    async def get_room_messages_page(
+        self,
+        room_id: str,
+        limit: int = 50,
+        before_id: Optional[str] = None,
+        after_id: Optional[str] = None,
+        since: Optional[datetime] = None
+    ) -> List[Tuple[Message, Optional[str]]]:
+        return await self._run(lambda service: service.get_room_messages_page(room_id, limit, before_id, after_id, since))
+
+    async def update_message_status(self, message_id: str, status: str, teleportation_result: Optional[Dict] = None) -> Optional[Message]:
+        return await self._run(lambda service: service.update_message_status(message_id, status, teleportation_result))
+
+    async def get_message(self, message_id: str) -> Optional[Message]:
+        return await self._run(lambda service: service.get_message(message_id))
+
+    async def get_message_with_sender(self, message_id: str) -> Optional[Tuple[Message, Optional[str]]]:
+        return await self._run(lambda service: service.get_message_with_sender(message_id))
+
+    async def expand_teleportation_results(self, messages: List[Message]) -> List[Optional[Dict]]:
+        return await self._run(lambda service: service.expand_teleportation_results(messages))
+
+    # Search
+    async def search_available(self) -> bool:
+        return await self._run(lambda service: service.search_available())
+
+    async def search_messages(
+        self,
+        query: str,
+        room_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> List[Tuple[Message, Optional[str], float, str]]:
+        return await self._run(lambda service: service.search_messages(query, room_id, user_id, limit, offset))
+
+    # Archive
+    async def archive_expired_messages(self) -> Dict[str, int]:
+        return await self._run(lambda service: service.archive_expired_messages())
+
+    async def get_archive_stats(self) -> Dict[str, Any]:
+        return await self._run(lambda service: service.get_archive_stats())
+
+    # Utility methods
+    async def user_in_room(self, user_id: str, room_id: str) -> bool:
+        return await self._run(lambda service: service.user_in_room(user_id, room_id))
+
+    get_cache_stats = staticmethod(ChatService.get_cache_stats)
+
+@asynccontextmanager
+async def chat_service_scope() -> AsyncIterator[AsyncChatService]:
+    """Open a session on the configured engine (async if available) and wrap it"""
+    if database.AsyncSessionLocal is not None:
+        async with database.AsyncSessionLocal() as db:
+            yield AsyncChatService(db)
+        return
+
+    db = database.SessionLocal()
+    try:
+        yield AsyncChatService(db)
+    finally:
+        db.close()
+
+async def get_chat_service() -> AsyncIterator[AsyncChatService]:
+    """Dependency to get a chat service on the configured database engine"""
+    async with chat_service_scope() as chat_service:
+        yield chat_service
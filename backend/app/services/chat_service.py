@@ -1,11 +1,28 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+from sqlalchemy import and_, or_, func, inspect, insert, update, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from typing import Iterator, List, Optional, Dict, Any, Tuple
+from datetime import datetime, timedelta
+from itertools import islice
+import heapq
 import uuid
 
 from app.models.database import User, Room, RoomParticipant, Message
-from app.schemas.chat import UserCreate, RoomCreate, MessageCreate
+from app.schemas.chat import UserCreate, RoomCreate, MessageCreate, BulkMessageItem
+from app.services.teleportation_storage import TeleportationResultStore
+from app.services.cache import lookup_cache, MISSING
+from app.services.message_archive import MessageArchiveStore, MAX_ID
+from app.services.message_search import MessageSearchIndex
+
+def _detached_copy(instance):
+    """Copy an ORM row's column values into a new instance not bound to any session"""
+    mapper = inspect(type(instance))
+    copy = type(instance)()
+    for attribute in mapper.column_attrs:
+        setattr(copy, attribute.key, getattr(instance, attribute.key))
+    return copy
 
 class ChatService:
     def __init__(self, db: Session):
@@ -21,11 +38,40 @@ class ChatService:
         self.db.add(db_user)
         self.db.commit()
         self.db.refresh(db_user)
+        lookup_cache.invalidate(("user", db_user.id))
         return db_user
     
     def get_user(self, user_id: str) -> Optional[User]:
-        """Get user by ID"""
-        return self.db.query(User).filter(User.id == user_id).first()
+        """
+        Get user by ID. Served from the lookup cache as a read-only copy that
+        is not attached to this session; use it for reads only.
+        """
+        cached = lookup_cache.get(("user", user_id))
+        if cached is not MISSING:
+            return cached
+        user = self.db.query(User).filter(User.id == user_id).first()
+        if user is None:
+            return None
+        snapshot = _detached_copy(user)
+        lookup_cache.set(("user", user_id), snapshot)
+        return snapshot
+    
+    def get_users(self, user_ids: List[str]) -> List[User]:
+        """
+        Get users by ID as read-only copies, like get_user: cached users come
+        from the lookup cache and the rest from one query. Unknown IDs are skipped.
+        """
+        users = {}
+        for user_id in user_ids:
+            cached = lookup_cache.get(("user", user_id))
+            if cached is not MISSING:
+                users[user_id] = cached
+        missing = [user_id for user_id in user_ids if user_id not in users]
+        if missing:
+            for user in self.db.query(User).filter(User.id.in_(missing)).all():
+                users[user.id] = _detached_copy(user)
+                lookup_cache.set(("user", user.id), users[user.id])
+        return [users[user_id] for user_id in user_ids if user_id in users]
     
     def get_user_by_username(self, username: str) -> Optional[User]:
         """Get user by username"""
@@ -33,12 +79,13 @@ class ChatService:
     
     def update_user_status(self, user_id: str, is_online: bool) -> Optional[User]:
         """Update user online status"""
-        user = self.get_user(user_id)
+        user = self.db.query(User).filter(User.id == user_id).first()
         if user:
             user.is_online = is_online
             user.last_seen = datetime.utcnow()
             self.db.commit()
             self.db.refresh(user)
+            lookup_cache.invalidate(("user", user_id))
         return user
     
     def get_online_users(self) -> List[User]:
@@ -53,23 +100,56 @@ class ChatService:
             created_by=created_by
         )
         self.db.add(db_room)
-        self.db.commit()
-        self.db.refresh(db_room)
+        self.db.flush()
         
         # Add creator to room
-        self.add_user_to_room(db_room.id, created_by)
+        self._insert_participant(db_room.id, created_by)
         
         # Add other participants
         for user_id in room_data.participant_ids:
             if user_id != created_by:
-                self.add_user_to_room(db_room.id, user_id)
+                self._insert_participant(db_room.id, user_id)
         
+        # Room and memberships are committed together
+        self.db.commit()
+        self.db.refresh(db_room)
+        lookup_cache.invalidate(
+            ("room", db_room.id),
+            *(("member", db_room.id, user_id) for user_id in {created_by, *room_data.participant_ids})
+        )
         return db_room
     
     def get_room(self, room_id: str) -> Optional[Room]:
         """Get room by ID"""
         return self.db.query(Room).filter(Room.id == room_id).first()
     
+    def room_exists(self, room_id: str) -> bool:
+        """Check that a room exists without loading it or its participants (cached)"""
+        if lookup_cache.get(("room", room_id)) is True:
+            return True
+        exists = self.db.query(Room.id).filter(Room.id == room_id).first() is not None
+        if exists:
+            lookup_cache.set(("room", room_id), True)
+        return exists
+    
+    def get_room_version(self, room_id: str) -> Optional[datetime]:
+        """
+        Get a room's message version (its last_activity), or None if the room
+        does not exist. Every message write bumps it, so an unchanged version
+        means an unchanged message history; reads only the rooms table.
+        """
+        row = self.db.query(Room.last_activity).filter(Room.id == room_id).first()
+        return row.last_activity if row else None
+    
+    def set_room_retention(self, room_id: str, retention_days: Optional[int]) -> Optional[Room]:
+        """Set a room's message retention in days (None falls back to the global setting)"""
+        room = self.get_room(room_id)
+        if room:
+            room.retention_days = retention_days
+            self.db.commit()
+            self.db.refresh(room)
+        return room
+    
     def get_user_rooms(self, user_id: str) -> List[Room]:
         """Get all rooms for a user"""
         return self.db.query(Room).join(RoomParticipant).filter(
@@ -80,32 +160,44 @@ class ChatService:
         """Get all rooms"""
         return self.db.query(Room).all()
     
-    def add_user_to_room(self, room_id: str, user_id: str) -> bool:
-        """Add user to room"""
-        # Check if user is already in room
-        existing = self.db.query(RoomParticipant).filter(
-            and_(RoomParticipant.room_id == room_id, RoomParticipant.user_id == user_id)
-        ).first()
+    def _insert_participant(self, room_id: str, user_id: str) -> bool:
+        """
+        Insert a membership row unless it already exists, without committing.
+        Returns True if a row was inserted. Relies on the unique
+        (room_id, user_id) index, so concurrent joins cannot create duplicates.
+        """
+        dialect = self.db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+            statement = insert(RoomParticipant).values(
+                room_id=room_id, user_id=user_id
+            ).on_conflict_do_nothing(index_elements=["room_id", "user_id"])
+            return self.db.execute(statement).rowcount == 1
         
-        if existing:
+        # Other databases: let the unique index reject the duplicate
+        try:
+            with self.db.begin_nested():
+                self.db.add(RoomParticipant(room_id=room_id, user_id=user_id))
+            return True
+        except IntegrityError:
             return False
-        
-        participant = RoomParticipant(room_id=room_id, user_id=user_id)
-        self.db.add(participant)
+    
+    def add_user_to_room(self, room_id: str, user_id: str) -> bool:
+        """Add user to room"""
+        # Insert-or-ignore: no existence check, no race between check and insert
+        inserted = self._insert_participant(room_id, user_id)
         self.db.commit()
-        return True
+        lookup_cache.invalidate(("member", room_id, user_id))
+        return inserted
     
     def remove_user_from_room(self, room_id: str, user_id: str) -> bool:
         """Remove user from room"""
-        participant = self.db.query(RoomParticipant).filter(
+        deleted = self.db.query(RoomParticipant).filter(
             and_(RoomParticipant.room_id == room_id, RoomParticipant.user_id == user_id)
-        ).first()
-        
-        if participant:
-            self.db.delete(participant)
-            self.db.commit()
-            return True
-        return False
+        ).delete(synchronize_session=False)
+        self.db.commit()
+        lookup_cache.invalidate(("member", room_id, user_id))
+        return deleted > 0
     
     def get_room_participants(self, room_id: str) -> List[User]:
         """Get all participants in a room"""
@@ -113,6 +205,11 @@ class ChatService:
             RoomParticipant.room_id == room_id
         ).all()
     
+    @staticmethod
+    def participant_users(room: Room) -> List[User]:
+        """Users in a room, from its eager-loaded participants (no extra query)"""
+        return [participant.user for participant in room.participants if participant.user]
+    
     # Message management
     def create_message(self, message_data: MessageCreate, sender_id: str) -> Message:
         """Create a new message"""
@@ -122,23 +219,197 @@ class ChatService:
             content=message_data.content,
             quantum_state=message_data.quantum_state
         )
+        return self._save_message(db_message)
+    
+    def create_teleported_message(self, message_data: MessageCreate, sender_id: str, teleportation_result: Dict) -> Message:
+        """
+        Store a completed teleportation as one unit of work: the message is
+        inserted already teleported, with its result, in a single transaction.
+        Run the simulator first, so a failed run writes nothing.
+        """
+        db_message = Message(
+            room_id=message_data.room_id,
+            sender_id=sender_id,
+            content=message_data.content,
+            quantum_state=message_data.quantum_state,
+            status="teleported",
+            # Store only the per-run outcome; the circuit lives in circuit_templates
+            teleportation_result=TeleportationResultStore(self.db).compact(teleportation_result)
+        )
+        return self._save_message(db_message)
+    
+    def create_messages(self, items: List[BulkMessageItem]) -> List[str]:
+        """
+        Insert many messages in one transaction and return their IDs in order.
+        Membership is checked once per distinct (sender, room) pair, rows go
+        in as one executemany, and each room's last activity is bumped once.
+        Raises ValueError, writing nothing, if any sender is not in its room.
+        """
+        pairs = {(item.room_id, item.sender_id) for item in items}
+        members = set(self.db.query(RoomParticipant.room_id, RoomParticipant.user_id).filter(
+            tuple_(RoomParticipant.room_id, RoomParticipant.user_id).in_(pairs)
+        ).all())
+        for room_id, sender_id in pairs:
+            if (room_id, sender_id) not in members:
+                raise ValueError(f"Sender {sender_id} not in room {room_id}")
+        
+        # Messages without a timestamp keep their submission order (history sorts by created_at)
+        now = datetime.utcnow()
+        rows = [{
+            "id": str(uuid.uuid4()),
+            "room_id": item.room_id,
+            "sender_id": item.sender_id,
+            "content": item.content,
+            "quantum_state": item.quantum_state,
+            "status": "sent",
+            "created_at": item.created_at or now + timedelta(microseconds=position)
+        } for position, item in enumerate(items)]
+        
+        self.db.execute(insert(Message), rows)
+        MessageSearchIndex(self.db).add(rows)
+        self.db.execute(update(Room), [
+            {"id": room_id, "last_activity": now} for room_id in sorted({item.room_id for item in items})
+        ])
+        self.db.commit()
+        return [row["id"] for row in rows]
+    
+    def _save_message(self, db_message: Message) -> Message:
+        """Insert a message, index it for search and bump its room's last activity in one commit"""
         self.db.add(db_message)
+        # Flush assigns the message ID the search index needs
+        self.db.flush()
+        MessageSearchIndex(self.db).add([
+            {"id": db_message.id, "room_id": db_message.room_id, "content": db_message.content}
+        ])
+        self.db.query(Room).filter(Room.id == db_message.room_id).update(
+            {Room.last_activity: datetime.utcnow()}, synchronize_session=False
+        )
         self.db.commit()
         self.db.refresh(db_message)
-        
-        # Update room last activity
-        room = self.get_room(message_data.room_id)
-        if room:
-            room.last_activity = datetime.utcnow()
-            self.db.commit()
-        
         return db_message
     
     def get_room_messages(self, room_id: str, limit: int = 50, offset: int = 0) -> List[Message]:
-        """Get messages for a room"""
-        return self.db.query(Message).filter(
+        """Get messages for a room, including archived ones"""
+        return [message for message, _ in self.get_room_messages_with_senders(room_id, limit, offset)]
+    
+    def get_room_messages_with_senders(self, room_id: str, limit: int = 50, offset: int = 0) -> List[Tuple[Message, Optional[str]]]:
+        """
+        Get messages for a room with each sender's username, oldest first,
+        by offset. When the room's archive is entirely older than its hot
+        messages the page is read from whichever side holds it; otherwise
+        both sides are merged from the start, which reads offset + limit
+        messages from each.
+        """
+        query = self.db.query(Message, User.username).outerjoin(
+            User, User.id == Message.sender_id
+        ).filter(
             Message.room_id == room_id
-        ).order_by(Message.created_at.asc()).offset(offset).limit(limit).all()
+        ).order_by(Message.created_at.asc(), Message.id.asc())
+        
+        archive = MessageArchiveStore(self.db)
+        oldest_hot = self.db.query(func.min(Message.created_at)).filter(Message.room_id == room_id).scalar()
+        archived = archive.slice_room(room_id, offset, limit, before=oldest_hot)
+        if archived is None:
+            archived = list(islice(archive.iter_room(room_id), offset + limit))
+            return self._merge_archived(query.limit(offset + limit).all(), iter(archived), offset + limit)[offset:]
+        
+        # Archived history comes first, then the hot table continues the positions
+        messages, archived_count = archived
+        rows = self._with_usernames(messages) if messages else []
+        if len(rows) < limit:
+            rows += query.offset(max(0, offset - archived_count)).limit(limit - len(rows)).all()
+        return rows
+    
+    def _with_usernames(self, messages: List[Message]) -> List[Tuple[Message, Optional[str]]]:
+        """Pair messages with their senders' usernames, from the user lookup cache"""
+        usernames = {user.id: user.username for user in self.get_users(list({m.sender_id for m in messages}))}
+        return [(message, usernames.get(message.sender_id)) for message in messages]
+    
+    def _merge_archived(
+        self,
+        rows: List[Tuple[Message, Optional[str]]],
+        archived: Iterator[Message],
+        limit: int,
+        descending: bool = False
+    ) -> List[Tuple[Message, Optional[str]]]:
+        """Merge a page of (message, username) rows with archived messages in the same order"""
+        archived_messages = list(islice(archived, limit))
+        if not archived_messages:
+            return rows
+        archived_rows = self._with_usernames(archived_messages)
+        merged = heapq.merge(rows, archived_rows, key=lambda row: (row[0].created_at, row[0].id), reverse=descending)
+        return list(islice(merged, limit))
+    
+    @staticmethod
+    def _page_edge(rows: List[Tuple[Message, Optional[str]]], limit: int) -> Optional[Tuple[datetime, str]]:
+        """
+        Key of the last row of a full page. Archived messages past it cannot
+        make the page, so bounding the archive scan by it skips their batches.
+        """
+        if len(rows) < limit:
+            return None
+        return (rows[-1][0].created_at, rows[-1][0].id)
+    
+    def get_room_messages_page(
+        self,
+        room_id: str,
+        limit: int = 50,
+        before_id: Optional[str] = None,
+        after_id: Optional[str] = None,
+        since: Optional[datetime] = None
+    ) -> List[Tuple[Message, Optional[str]]]:
+        """
+        Keyset-paginated room history with sender usernames, oldest first.
+        Without a cursor returns the newest `limit` messages; before_id/after_id
+        return the page just older/newer than that message, and `since` the
+        first `limit` messages created after that time. Each page is an
+        index seek on (room_id, created_at, id), so cost does not grow with depth.
+        Archived messages are merged in from the room's archive batches.
+        Raises ValueError if the cursor message is not in the room.
+        """
+        archive = MessageArchiveStore(self.db)
+        query = self.db.query(Message, User.username).outerjoin(
+            User, User.id == Message.sender_id
+        ).filter(Message.room_id == room_id)
+        
+        if since is not None:
+            query = query.filter(Message.created_at > since)
+            rows = query.order_by(Message.created_at.asc(), Message.id.asc()).limit(limit).all()
+            archived = archive.iter_room(room_id, after=(since, MAX_ID), before=self._page_edge(rows, limit))
+            return self._merge_archived(rows, archived, limit)
+        
+        cursor_id = before_id or after_id
+        if cursor_id:
+            cursor = self.db.query(Message.created_at, Message.id).filter(
+                and_(Message.id == cursor_id, Message.room_id == room_id)
+            ).first()
+            if not cursor:
+                cursor = archive.get_message(cursor_id)
+                if not cursor or cursor.room_id != room_id:
+                    raise ValueError("Cursor message not found in room")
+            cursor_key = (cursor.created_at, cursor.id)
+        
+        if after_id:
+            query = query.filter(or_(
+                Message.created_at > cursor.created_at,
+                and_(Message.created_at == cursor.created_at, Message.id > cursor.id)
+            ))
+            rows = query.order_by(Message.created_at.asc(), Message.id.asc()).limit(limit).all()
+            archived = archive.iter_room(room_id, after=cursor_key, before=self._page_edge(rows, limit))
+            return self._merge_archived(rows, archived, limit)
+        
+        if before_id:
+            query = query.filter(or_(
+                Message.created_at < cursor.created_at,
+                and_(Message.created_at == cursor.created_at, Message.id < cursor.id)
+            ))
+        rows = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit).all()
+        archived = archive.iter_room(
+            room_id, after=self._page_edge(rows, limit), before=cursor_key if before_id else None, descending=True
+        )
+        rows = self._merge_archived(rows, archived, limit, descending=True)
+        rows.reverse()
+        return rows
     
     def update_message_status(self, message_id: str, status: str, teleportation_result: Optional[Dict] = None) -> Optional[Message]:
         """Update message status (e.g., after quantum teleportation)"""
@@ -146,19 +417,103 @@ class ChatService:
         if message:
             message.status = status
             if teleportation_result:
-                message.teleportation_result = teleportation_result
+                # Store only the per-run outcome; the circuit lives in circuit_templates
+                message.teleportation_result = TeleportationResultStore(self.db).compact(teleportation_result)
+            # A changed message is a new room version
+            self.db.query(Room).filter(Room.id == message.room_id).update(
+                {Room.last_activity: datetime.utcnow()}, synchronize_session=False
+            )
             self.db.commit()
             self.db.refresh(message)
         return message
     
     def get_message(self, message_id: str) -> Optional[Message]:
-        """Get message by ID"""
-        return self.db.query(Message).filter(Message.id == message_id).first()
+        """Get message by ID, from the archive if it has been archived"""
+        message = self.db.query(Message).filter(Message.id == message_id).first()
+        return message or MessageArchiveStore(self.db).get_message(message_id)
+    
+    def get_message_with_sender(self, message_id: str) -> Optional[Tuple[Message, Optional[str]]]:
+        """Get message by ID with its sender's username, in a single joined query"""
+        row = self.db.query(Message, User.username).outerjoin(
+            User, User.id == Message.sender_id
+        ).filter(Message.id == message_id).first()
+        if row:
+            return row
+        archived = MessageArchiveStore(self.db).get_message(message_id)
+        return self._with_usernames([archived])[0] if archived else None
+    
+    def expand_teleportation_results(self, messages: List[Message]) -> List[Optional[Dict]]:
+        """Rebuild the full teleportation result for each message, in order"""
+        return TeleportationResultStore(self.db).expand_many(m.teleportation_result for m in messages)
+    
+    # Search
+    def search_available(self) -> bool:
+        """Check whether the full-text search index is available (SQLite with FTS5)"""
+        return MessageSearchIndex(self.db).available
+    
+    def search_messages(
+        self,
+        query: str,
+        room_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> List[Tuple[Message, Optional[str], float, str]]:
+        """
+        Full-text search over message content, best match first, as
+        (message, sender username, score, snippet). Restrict to one room with
+        room_id, or to a user's rooms with user_id. Archived messages are
+        included. Raises ValueError if the query has no searchable words.
+        """
+        # The index filters by room, so a user's search runs over their room IDs
+        room_ids = [room_id] if room_id is not None else []
+        if user_id is not None:
+            member_rooms = {
+                row.room_id for row in self.db.query(RoomParticipant.room_id).filter(RoomParticipant.user_id == user_id)
+            }
+            room_ids = [r for r in room_ids if r in member_rooms] if room_id is not None else sorted(member_rooms)
+        matches = MessageSearchIndex(self.db).search(query, room_ids, limit=limit, offset=offset)
+        if not matches:
+            return []
+        
+        message_ids = [message_id for message_id, _, _ in matches]
+        found = {message.id: (message, username) for message, username in self.db.query(Message, User.username).outerjoin(
+            User, User.id == Message.sender_id
+        ).filter(Message.id.in_(message_ids)).all()}
+        # Matches no longer in the messages table come from the archive
+        archive = MessageArchiveStore(self.db)
+        archived = [archive.get_message(message_id) for message_id in message_ids if message_id not in found]
+        for message, username in self._with_usernames([message for message in archived if message]):
+            found[message.id] = (message, username)
+        return [
+            found[message_id] + (score, snippet)
+            for message_id, score, snippet in matches if message_id in found
+        ]
+    
+    # Archive
+    def archive_expired_messages(self) -> Dict[str, int]:
+        """Move messages past their room's retention into the compressed archive"""
+        return MessageArchiveStore(self.db).archive_expired()
+    
+    def get_archive_stats(self) -> Dict[str, Any]:
+        """Get archive size and compression ratio"""
+        return MessageArchiveStore(self.db).get_stats()
     
     # Utility methods
     def user_in_room(self, user_id: str, room_id: str) -> bool:
-        """Check if user is in room"""
-        participant = self.db.query(RoomParticipant).filter(
+        """Check if user is in room (cached, including negative answers)"""
+        key = ("member", room_id, user_id)
+        cached = lookup_cache.get(key)
+        if cached is not MISSING:
+            return cached
+        # Select only indexed columns so the lookup is answered from the membership index
+        participant = self.db.query(RoomParticipant.room_id).filter(
             and_(RoomParticipant.room_id == room_id, RoomParticipant.user_id == user_id)
         ).first()
+        lookup_cache.set(key, participant is not None)
         return participant is not None
+    
+    @staticmethod
+    def get_cache_stats() -> Dict[str, Any]:
+        """Get lookup cache size and hit ratio"""
+        return lookup_cache.get_stats()
@@ -0,0 +1,155 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import asyncio
+import threading
+import time
+
+from app.core.config import settings
+from app.database.session import engine, get_engine_settings
+from app.services.message_search import SEARCH_SHADOW_TABLES
+
+# Most recent rows shown per table on detail requests
+SAMPLE_SIZE = 50
+
+_SAMPLE_QUERIES = {
+    "users": f"""
+        SELECT id, username, email, is_online, last_seen, created_at
+        FROM users
+        ORDER BY created_at DESC
+        LIMIT {SAMPLE_SIZE}
+    """,
+    "rooms": f"""
+        SELECT id, name, created_by, created_at, last_activity
+        FROM rooms
+        ORDER BY created_at DESC
+        LIMIT {SAMPLE_SIZE}
+    """,
+    # Long message content is cut to 100 characters
+    "messages": f"""
+        SELECT id, room_id, sender_id,
+               CASE
+                   WHEN length(content) > 100 THEN substr(content, 1, 100) || '...'
+                   ELSE content
+               END as content,
+               quantum_state, status, created_at
+        FROM messages
+        ORDER BY created_at DESC
+        LIMIT {SAMPLE_SIZE}
+    """,
+    "room_participants": f"""
+        SELECT id, room_id, user_id, joined_at
+        FROM room_participants
+        ORDER BY joined_at DESC
+        LIMIT {SAMPLE_SIZE}
+    """,
+    # Batch metadata only; the payload is compressed binary
+    "message_archives": f"""
+        SELECT id, room_id, first_created_at, last_created_at, message_count,
+               raw_size, length(payload) as compressed_size, created_at
+        FROM message_archives
+        ORDER BY created_at DESC
+        LIMIT {SAMPLE_SIZE}
+    """
+}
+
+def _table_samples(conn: Connection, tables: List[str], counts: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """Most recent rows of each non-empty table, with datetimes as ISO strings and binary values summarized"""
+    samples = {}
+    for table in tables:
+        if not isinstance(counts.get(table), int) or counts[table] == 0:
+            samples[table] = []
+            continue
+        query = _SAMPLE_QUERIES.get(table, f"SELECT * FROM {table} LIMIT {SAMPLE_SIZE}")
+        rows = [dict(row) for row in conn.execute(text(query)).mappings()]
+        for row in rows:
+            for key, value in row.items():
+                if hasattr(value, "isoformat"):
+                    row[key] = value.isoformat()
+                elif isinstance(value, bytes):
+                    row[key] = f"<{len(value)} bytes>"
+        samples[table] = rows
+    return samples
+
+class DatabaseStats:
+    """
+    Cached /db-status snapshot: table list, row counts and engine settings,
+    gathered over a single connection and refreshed every `refresh_interval`
+    seconds in the background. Polling the endpoint reads the snapshot and
+    never touches the database; row samples are only fetched on request.
+    """
+
+    def __init__(self, refresh_interval: float = 30.0):
+        self.refresh_interval = refresh_interval
+        self._snapshot: Optional[Dict[str, Any]] = None
+        # Monotonic time of the last refresh, for the snapshot's age
+        self._refreshed: float = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, include_samples: bool = False) -> Dict[str, Any]:
+        """
+        Rebuild the snapshot over one connection. With include_samples the
+        most recent rows of each table are read on the same connection and
+        returned under "table_data" (they are not cached).
+        """
+        started = time.perf_counter()
+        with engine.connect() as conn:
+            # FTS5 shadow tables are internal to the search index
+            tables = [table for table in inspect(conn).get_table_names() if table not in SEARCH_SHADOW_TABLES]
+            counts: Dict[str, Any] = {}
+            if tables:
+                # All counts in one statement
+                quote = engine.dialect.identifier_preparer.quote
+                query = " UNION ALL ".join(
+                    f"SELECT '{table}' AS name, COUNT(*) AS count FROM {quote(table)}" for table in tables
+                )
+                counts = {row.name: row.count for row in conn.execute(text(query))}
+            engine_info = get_engine_settings(conn)
+            samples = _table_samples(conn, tables, counts) if include_samples else None
+
+        snapshot = {
+            "tables": tables,
+            "table_counts": counts,
+            "engine": engine_info,
+            "refreshed_at": datetime.utcnow().isoformat(),
+            "refresh_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+        with self._lock:
+            self._snapshot = snapshot
+            self._refreshed = time.monotonic()
+        result = self._with_age(snapshot, 0.0)
+        if samples is not None:
+            result["table_data"] = samples
+        return result
+
+    def get_snapshot(self) -> Optional[Dict[str, Any]]:
+        """
+        The cached snapshot with its age in seconds, or None if there is none
+        yet (e.g. right after clear()). Never touches the database.
+        """
+        with self._lock:
+            snapshot, refreshed = self._snapshot, self._refreshed
+        if snapshot is None:
+            return None
+        return self._with_age(snapshot, time.monotonic() - refreshed)
+
+    @staticmethod
+    def _with_age(snapshot: Dict[str, Any], age: float) -> Dict[str, Any]:
+        return {**snapshot, "age_seconds": round(age, 3)}
+
+    async def run_refresh_loop(self) -> None:
+        """Refresh the snapshot now and then every refresh_interval seconds until cancelled"""
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                print(f"⚠️ Database stats refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def clear(self) -> None:
+        """Drop the snapshot, e.g. after the database has been reset"""
+        with self._lock:
+            self._snapshot = None
+
+db_stats = DatabaseStats(refresh_interval=settings.DB_STATS_REFRESH_INTERVAL)
@@ -0,0 +1,265 @@
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import heapq
+import json
+import zlib
+
+from app.core.config import settings
+from app.database.session import SessionLocal
+from app.services.cache import TTLCache, MISSING
+from app.models.database import Room, Message, MessageArchive, ArchivedMessage
+
+# Columns kept for each archived message
+ARCHIVED_COLUMNS = ("id", "room_id", "sender_id", "content", "quantum_state", "teleportation_result", "status", "created_at")
+
+# Sorts after any message ID, so (since, MAX_ID) excludes messages created exactly at `since`
+MAX_ID = "\uffff"
+
+# Decoded batches, so paging through archived history decompresses each batch
+# once. Batches never change after they are written.
+archive_batch_cache = TTLCache(max_size=settings.MESSAGE_ARCHIVE_CACHE_BATCHES, ttl=300.0)
+
+def _compress(messages: List[Dict[str, Any]]) -> Tuple[bytes, int]:
+    """Compressed JSON payload of a batch and its uncompressed size"""
+    raw = json.dumps(messages, ensure_ascii=False, separators=(",", ":"), default=datetime.isoformat).encode("utf-8")
+    return zlib.compress(raw, 9), len(raw)
+
+def _decompress(payload: bytes) -> List[Dict[str, Any]]:
+    """Archived message records of a batch, oldest first"""
+    records = json.loads(zlib.decompress(payload))
+    for record in records:
+        record["created_at"] = datetime.fromisoformat(record["created_at"])
+    return records
+
+def _key(record: Dict[str, Any]) -> Tuple[datetime, str]:
+    return (record["created_at"], record["id"])
+
+class _Descending:
+    """Heap entry ordering keys newest first"""
+    __slots__ = ("key",)
+
+    def __init__(self, key: Tuple[datetime, str]):
+        self.key = key
+
+    def __lt__(self, other: "_Descending") -> bool:
+        return self.key > other.key
+
+class MessageArchiveStore:
+    """
+    Cold storage for messages past their room's retention window. Old
+    messages are moved out of the messages table in batches, each stored
+    as one row of zlib-compressed JSON, so the hot table only holds recent
+    history. Archived messages are read back as transient Message objects
+    and are read-only.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def archive_room(self, room_id: str, cutoff: datetime, batch_size: int = 1000) -> Tuple[int, int]:
+        """
+        Move a room's messages created before `cutoff` into the archive,
+        one batch per transaction. Returns (messages archived, batches written).
+        """
+        table = Message.__table__
+        columns = [table.c[name] for name in ARCHIVED_COLUMNS]
+        archived = batches = 0
+        while True:
+            rows = self.db.execute(
+                select(*columns).where(table.c.room_id == room_id, table.c.created_at < cutoff)
+                .order_by(table.c.created_at, table.c.id).limit(batch_size)
+            ).mappings().all()
+            if not rows:
+                break
+
+            payload, raw_size = _compress([dict(row) for row in rows])
+            archive = MessageArchive(
+                room_id=room_id,
+                first_created_at=rows[0]["created_at"],
+                last_created_at=rows[-1]["created_at"],
+                message_count=len(rows),
+                raw_size=raw_size,
+                payload=payload
+            )
+            self.db.add(archive)
+            self.db.flush()
+            message_ids = [row["id"] for row in rows]
+            self.db.execute(insert(ArchivedMessage), [
+                {"message_id": message_id, "archive_id": archive.id} for message_id in message_ids
+            ])
+            self.db.execute(delete(Message).where(Message.id.in_(message_ids)), execution_options={"synchronize_session": False})
+            self.db.commit()
+
+            archived += len(rows)
+            batches += 1
+            if len(rows) < batch_size:
+                break
+        return archived, batches
+
+    def archive_expired(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Apply the retention policy to every room: a room's retention_days,
+        or MESSAGE_RETENTION_DAYS when it has none. 0 keeps messages forever.
+        """
+        now = now or datetime.utcnow()
+        counts = {"rooms": 0, "messages": 0, "batches": 0}
+        for room_id, retention_days in self.db.query(Room.id, Room.retention_days).all():
+            if retention_days is None:
+                retention_days = settings.MESSAGE_RETENTION_DAYS
+            if not retention_days:
+                continue
+            archived, batches = self.archive_room(
+                room_id, now - timedelta(days=retention_days), settings.MESSAGE_ARCHIVE_BATCH_SIZE
+            )
+            if archived:
+                counts["rooms"] += 1
+                counts["messages"] += archived
+                counts["batches"] += batches
+        return counts
+
+    def _load(self, archive_id: str) -> List[Dict[str, Any]]:
+        records = archive_batch_cache.get(archive_id)
+        if records is MISSING:
+            payload = self.db.query(MessageArchive.payload).filter(MessageArchive.id == archive_id).scalar()
+            records = _decompress(payload) if payload is not None else []
+            archive_batch_cache.set(archive_id, records)
+        return records
+
+    def iter_batches(self) -> Iterator[List[Dict[str, Any]]]:
+        """Yield the message records of every archive batch, oldest batch first"""
+        archive_ids = [row.id for row in self.db.query(MessageArchive.id).order_by(MessageArchive.created_at)]
+        for archive_id in archive_ids:
+            payload = self.db.query(MessageArchive.payload).filter(MessageArchive.id == archive_id).scalar()
+            if payload is not None:
+                yield _decompress(payload)
+
+    def get_message(self, message_id: str) -> Optional[Message]:
+        """Get an archived message by ID"""
+        archive_id = self.db.query(ArchivedMessage.archive_id).filter(
+            ArchivedMessage.message_id == message_id
+        ).scalar()
+        if archive_id is None:
+            return None
+        record = next((record for record in self._load(archive_id) if record["id"] == message_id), None)
+        return Message(**record) if record else None
+
+    def slice_room(
+        self,
+        room_id: str,
+        offset: int,
+        limit: int,
+        before: Optional[datetime] = None
+    ) -> Optional[Tuple[List[Message], int]]:
+        """
+        A room's archived messages at positions [offset, offset + limit),
+        oldest first, and its archived message count. Batches are skipped by
+        their message counts, so only those holding the slice are read.
+        Returns None when positions cannot be counted that way: batches
+        overlapping in time, or a batch reaching `before`.
+        """
+        batches = self.db.query(
+            MessageArchive.id, MessageArchive.first_created_at, MessageArchive.last_created_at, MessageArchive.message_count
+        ).filter(MessageArchive.room_id == room_id).order_by(MessageArchive.first_created_at, MessageArchive.id).all()
+        if any(batch.first_created_at <= previous.last_created_at for previous, batch in zip(batches, batches[1:])):
+            return None
+        if before is not None and batches and batches[-1].last_created_at >= before:
+            return None
+
+        messages: List[Message] = []
+        position = 0
+        for batch in batches:
+            if len(messages) >= limit:
+                break
+            if position + batch.message_count > offset:
+                start = max(0, offset - position)
+                records = self._load(batch.id)[start:start + limit - len(messages)]
+                messages.extend(Message(**record) for record in records)
+            position += batch.message_count
+        return messages, sum(batch.message_count for batch in batches)
+
+    def iter_room(
+        self,
+        room_id: str,
+        after: Optional[Tuple[datetime, str]] = None,
+        before: Optional[Tuple[datetime, str]] = None,
+        descending: bool = False
+    ) -> Iterator[Message]:
+        """
+        Yield a room's archived messages strictly between the (created_at, id)
+        keys `after` and `before`, oldest first or newest first. Batches are
+        decompressed only as the iteration reaches their range, so taking a
+        page from the newest end does not read older batches.
+        """
+        query = self.db.query(
+            MessageArchive.id, MessageArchive.first_created_at, MessageArchive.last_created_at
+        ).filter(MessageArchive.room_id == room_id)
+        if after is not None:
+            query = query.filter(MessageArchive.last_created_at >= after[0])
+        if before is not None:
+            query = query.filter(MessageArchive.first_created_at <= before[0])
+        if descending:
+            # A batch can hold messages newer than the next one's end, so merge by key
+            batches = query.order_by(MessageArchive.last_created_at.desc(), MessageArchive.id).all()
+            reaches = lambda batch, key: batch.last_created_at >= key[0]
+            heap_key = lambda record: _Descending(_key(record))
+        else:
+            batches = query.order_by(MessageArchive.first_created_at, MessageArchive.id).all()
+            reaches = lambda batch, key: batch.first_created_at <= key[0]
+            heap_key = _key
+
+        heap: List[Tuple[Any, int, Dict[str, Any]]] = []
+        sequence = 0
+        position = 0
+        while True:
+            # Load every batch that could hold a message ordered before the heap's head
+            while position < len(batches) and (not heap or reaches(batches[position], _key(heap[0][2]))):
+                for record in self._load(batches[position].id):
+                    key = _key(record)
+                    if (after is None or key > after) and (before is None or key < before):
+                        heapq.heappush(heap, (heap_key(record), sequence, record))
+                        sequence += 1
+                position += 1
+            if not heap:
+                return
+            # Only messages actually taken are built as Message objects
+            yield Message(**heapq.heappop(heap)[2])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get archive size and compression ratio"""
+        batches, messages, raw_bytes, compressed_bytes = self.db.query(
+            func.count(MessageArchive.id),
+            func.coalesce(func.sum(MessageArchive.message_count), 0),
+            func.coalesce(func.sum(MessageArchive.raw_size), 0),
+            func.coalesce(func.sum(func.length(MessageArchive.payload)), 0)
+        ).one()
+        return {
+            "batches": batches,
+            "messages": messages,
+            "raw_bytes": raw_bytes,
+            "compressed_bytes": compressed_bytes,
+            "compression_ratio": raw_bytes / compressed_bytes if compressed_bytes else 0.0,
+            "batch_cache": archive_batch_cache.get_stats(),
+            "retention_days": settings.MESSAGE_RETENTION_DAYS,
+            "archive_interval_seconds": settings.MESSAGE_ARCHIVE_INTERVAL
+        }
+
+async def run_archive_loop(interval: float) -> None:
+    """Apply the retention policy every `interval` seconds until cancelled"""
+    def archive_once() -> Dict[str, int]:
+        db = SessionLocal()
+        try:
+            return MessageArchiveStore(db).archive_expired()
+        finally:
+            db.close()
+
+    while True:
+        try:
+            counts = await asyncio.to_thread(archive_once)
+            if counts["messages"]:
+                print(f"🗄️ Archived {counts['messages']} messages from {counts['rooms']} rooms")
+        except Exception as e:
+            print(f"⚠️ Message archiving failed: {e}")
+        await asyncio.sleep(interval)
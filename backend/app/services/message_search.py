@@ -0,0 +1,138 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional, Tuple
+import re
+
+from app.database.session import IS_SQLITE
+from app.services.message_archive import MessageArchiveStore
+
+# FTS5 virtual table indexing message content. It is not part of the ORM
+# metadata (create_all cannot create virtual tables); see ensure_search_index.
+SEARCH_TABLE = "message_search"
+
+# Shadow tables FTS5 keeps for SEARCH_TABLE
+SEARCH_SHADOW_TABLES = {f"{SEARCH_TABLE}_{suffix}" for suffix in ("data", "idx", "content", "docsize", "config")}
+
+# Whether the index exists in this process's database; None until first checked
+_index_ready: Optional[bool] = None
+
+_INSERT = text(f"INSERT INTO {SEARCH_TABLE} (content, room_token, message_id) VALUES (:content, :room_token, :message_id)")
+
+def room_token(room_id: str) -> str:
+    """
+    Room ID as a single FTS5 token. Filtering on an indexed token lets FTS5
+    intersect doclists instead of reading every match's row to check its room.
+    """
+    return "r" + room_id.replace("-", "")
+
+def fts_query(query: str) -> str:
+    """
+    Turn user input into an FTS5 query: every word must match, a trailing *
+    matches a prefix. Words are quoted, so FTS5 operators and punctuation in
+    the input cannot cause syntax errors. Raises ValueError if there are no words.
+    """
+    terms = re.findall(r"\w+\*?", query)
+    if not terms:
+        raise ValueError("Search query has no searchable words")
+    return " ".join(
+        f'"{term[:-1]}"*' if term.endswith("*") else f'"{term}"' for term in terms
+    )
+
+def create_search_index(conn: Connection) -> bool:
+    """Create the FTS5 table if missing; returns False if SQLite lacks FTS5 (or the database is not SQLite)"""
+    global _index_ready
+    if not IS_SQLITE:
+        _index_ready = False
+        return False
+    try:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": SEARCH_TABLE}
+        ).first() is not None
+        if not exists:
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+                "content, room_token, message_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')"
+            ))
+            # Rank by content only; room tokens are for filtering
+            conn.execute(text(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rank) VALUES ('rank', 'bm25(1.0, 0.0)')"))
+    except OperationalError:
+        _index_ready = False
+        return False
+    _index_ready = True
+    return True
+
+def drop_search_index(conn: Connection) -> None:
+    """Drop the FTS5 table, e.g. when the database is reset"""
+    global _index_ready
+    if IS_SQLITE:
+        conn.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+    _index_ready = False
+
+def search_index_ready(db: Session) -> bool:
+    """Check (once per process) whether the search index exists"""
+    global _index_ready
+    if _index_ready is None:
+        _index_ready = IS_SQLITE and db.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": SEARCH_TABLE}
+        ).first() is not None
+    return _index_ready
+
+class MessageSearchIndex:
+    """
+    Full-text index over message content, in an SQLite FTS5 table keyed by
+    message ID. Writers add rows in the same transaction as the messages.
+    Archived messages keep their index rows, since they stay readable by ID.
+    All methods do nothing (or find nothing) when the index is unavailable.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @property
+    def available(self) -> bool:
+        return search_index_ready(self.db)
+
+    def add(self, messages: List[Dict[str, Any]]) -> None:
+        """Index messages given as dicts with id, room_id and content; does not commit"""
+        if not messages or not self.available:
+            return
+        self.db.execute(_INSERT, [
+            {"content": message["content"], "room_token": room_token(message["room_id"]), "message_id": message["id"]}
+            for message in messages
+        ])
+
+    def search(self, query: str, room_ids: List[str], limit: int = 20, offset: int = 0) -> List[Tuple[str, float, str]]:
+        """
+        Ranked matches in the given rooms as (message_id, score, snippet),
+        best first. Scores are BM25 relevance; higher is better.
+        Raises ValueError if the query has no searchable words.
+        """
+        match = fts_query(query)
+        if not room_ids or not self.available:
+            return []
+        rooms = " OR ".join('"' + room_token(room_id).replace('"', '""') + '"' for room_id in room_ids)
+        rows = self.db.execute(text(f"""
+            SELECT message_id, rank, snippet({SEARCH_TABLE}, 0, '[', ']', '…', 12) AS snippet
+            FROM {SEARCH_TABLE}
+            WHERE {SEARCH_TABLE} MATCH :match
+            ORDER BY rank, rowid DESC
+            LIMIT :limit OFFSET :offset
+        """), {"match": f"content : ({match}) AND room_token : ({rooms})", "limit": limit, "offset": offset}).all()
+        return [(row.message_id, -row.rank, row.snippet) for row in rows]
+
+    def rebuild(self) -> int:
+        """Re-index every message, hot and archived; returns the number indexed"""
+        if not self.available:
+            return 0
+        self.db.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+        indexed = self.db.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (content, room_token, message_id) "
+            "SELECT content, 'r' || replace(room_id, '-', ''), id FROM messages"
+        )).rowcount
+        for records in MessageArchiveStore(self.db).iter_batches():
+            self.add(records)
+            indexed += len(records)
+        self.db.commit()
+        return indexed
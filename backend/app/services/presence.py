@@ -0,0 +1,173 @@
+from sqlalchemy import update, bindparam
+from typing import Any, Dict, Optional, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import threading
+
+from app.core.config import settings
+from app.database.session import SessionLocal
+from app.models.database import User
+from app.services.cache import lookup_cache
+
+class PresenceService:
+    """
+    In-memory online presence. Heartbeats only touch a dict; users whose
+    last heartbeat is older than `ttl` seconds count as offline. last_seen
+    and is_online reach the users table in periodic batches, one
+    executemany per flush instead of one commit per heartbeat.
+
+    Presence is per process: with several workers each one only sees the
+    heartbeats it received. Nothing survives a restart, so users are
+    signed off on shutdown and any is_online rows left over are cleared
+    on startup.
+    """
+
+    def __init__(self, ttl: float = 60.0, flush_interval: float = 10.0):
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self._last_seen: Dict[str, datetime] = {}
+        # user_id -> (last_seen, is_online) waiting to be written
+        self._pending: Dict[str, Tuple[datetime, bool]] = {}
+        self._lock = threading.Lock()
+        self.heartbeats = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+
+    def heartbeat(self, user_id: str, is_online: bool = True) -> None:
+        """Record a heartbeat, or an explicit sign-off when is_online is False"""
+        now = datetime.utcnow()
+        with self._lock:
+            self.heartbeats += 1
+            if is_online:
+                self._last_seen[user_id] = now
+            else:
+                self._last_seen.pop(user_id, None)
+            self._pending[user_id] = (now, is_online)
+
+    def _expire(self) -> None:
+        """Mark users whose heartbeats stopped as offline; call with the lock held"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        expired = [user_id for user_id, seen in self._last_seen.items() if seen < cutoff]
+        for user_id in expired:
+            self._pending[user_id] = (self._last_seen.pop(user_id), False)
+
+    def online_users(self) -> Dict[str, datetime]:
+        """Online user IDs with their last heartbeat"""
+        with self._lock:
+            self._expire()
+            return dict(self._last_seen)
+
+    def status(self, user_id: str) -> Tuple[bool, Optional[datetime]]:
+        """
+        A user's (is_online, last_seen) as the users table will hold them
+        after the next flush. last_seen is None when presence has nothing
+        newer than the table.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        with self._lock:
+            seen = self._last_seen.get(user_id)
+            if seen is not None:
+                return seen >= cutoff, seen
+            pending = self._pending.get(user_id)
+            return False, pending[0] if pending else None
+
+    def is_online(self, user_id: str) -> bool:
+        """Check whether a user has a live heartbeat"""
+        return user_id in self.online_users()
+
+    def sign_off_all(self) -> None:
+        """Queue every online user as offline, e.g. before shutting down"""
+        now = datetime.utcnow()
+        with self._lock:
+            for user_id in self._last_seen:
+                self._pending[user_id] = (now, False)
+            self._last_seen.clear()
+
+    def reset_online(self) -> int:
+        """
+        Mark every user offline in the users table; called on startup, when
+        no heartbeats are known yet. Returns the number of users updated.
+        """
+        db = SessionLocal()
+        try:
+            updated = db.execute(
+                update(User.__table__).where(User.__table__.c.is_online.is_(True)).values(is_online=False)
+            ).rowcount
+            db.commit()
+        finally:
+            db.close()
+        lookup_cache.clear()
+        return updated
+
+    def flush(self) -> int:
+        """Write pending presence changes to the users table; returns rows written"""
+        with self._lock:
+            self._expire()
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        rows = [
+            {"user_key": user_id, "seen": last_seen, "online": is_online}
+            for user_id, (last_seen, is_online) in pending.items()
+        ]
+        statement = update(User.__table__).where(
+            User.__table__.c.id == bindparam("user_key")
+        ).values(last_seen=bindparam("seen"), is_online=bindparam("online"))
+
+        db = SessionLocal()
+        try:
+            db.execute(statement, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Keep the changes for the next flush unless newer ones arrived
+            with self._lock:
+                for user_id, change in pending.items():
+                    self._pending.setdefault(user_id, change)
+            raise
+        finally:
+            db.close()
+
+        lookup_cache.invalidate(*(("user", user_id) for user_id in pending))
+        with self._lock:
+            self.flushes += 1
+            self.rows_flushed += len(rows)
+        return len(rows)
+
+    async def run_flush_loop(self) -> None:
+        """
+        Flush every flush_interval seconds until cancelled, then sign every
+        user off and flush once more
+        """
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                try:
+                    await asyncio.to_thread(self.flush)
+                except Exception as e:
+                    print(f"⚠️ Presence flush failed: {e}")
+        finally:
+            self.sign_off_all()
+            await asyncio.to_thread(self.flush)
+
+    def clear(self) -> None:
+        """Forget all presence, e.g. after the database has been reset"""
+        with self._lock:
+            self._last_seen.clear()
+            self._pending.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get presence and flush counters"""
+        with self._lock:
+            return {
+                "online": len(self._last_seen),
+                "pending_flush": len(self._pending),
+                "ttl_seconds": self.ttl,
+                "flush_interval_seconds": self.flush_interval,
+                "heartbeats": self.heartbeats,
+                "flushes": self.flushes,
+                "rows_flushed": self.rows_flushed
+            }
+
+presence_service = PresenceService(ttl=settings.PRESENCE_TTL, flush_interval=settings.PRESENCE_FLUSH_INTERVAL)
@@ -0,0 +1,131 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from app.services.quantum_service import QuantumTeleportationService
+
+class SimulatorQueueFull(Exception):
+    """Raised when the simulator worker pool has no free queue slot"""
+    pass
+
+# Per-process service used when the executor runs in process mode
+_worker_service: Optional[QuantumTeleportationService] = None
+
+def _init_worker(simulator_name: str, shots: int) -> None:
+    """Process pool initializer: build and warm this worker's own service"""
+    global _worker_service
+    _worker_service = QuantumTeleportationService(simulator_name=simulator_name, shots=shots)
+    _worker_service.warm_cache()
+
+def _call_worker_service(method: str, args: tuple, kwargs: dict) -> Any:
+    """Run a service method on the worker process's service"""
+    return getattr(_worker_service, method)(*args, **kwargs)
+
+class QuantumExecutor:
+    """
+    Runs blocking simulator calls on a bounded thread or process pool so
+    the asyncio event loop stays free. At most max_workers jobs run at once
+    and at most max_queue more may wait; anything beyond that is rejected
+    immediately with SimulatorQueueFull.
+    """
+
+    def __init__(
+        self,
+        service: QuantumTeleportationService,
+        mode: str = "thread",
+        max_workers: int = 2,
+        max_queue: int = 32
+    ):
+        if mode not in ("thread", "process"):
+            raise ValueError("Executor mode must be 'thread' or 'process'")
+        self.service = service
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        # Metrics (only touched from the event loop thread)
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _get_pool(self) -> Executor:
+        """Create the worker pool on first use"""
+        if self._pool is None:
+            if self.mode == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker,
+                    initargs=(self.service.simulator_name, self.service.shots)
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="quantum")
+        return self._pool
+
+    async def run(self, method: str, *args, **kwargs) -> Any:
+        """
+        Run QuantumTeleportationService.<method>(*args, **kwargs) in the pool.
+        Raises SimulatorQueueFull if the pool and its queue are both full.
+        """
+        if self.queued + self.running >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise SimulatorQueueFull("Quantum simulator is busy, try again shortly")
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+
+        if self.mode == "process":
+            call = functools.partial(_call_worker_service, method, args, kwargs)
+        else:
+            call = functools.partial(getattr(self.service, method), *args, **kwargs)
+
+        # Wait for a worker slot; jobs beyond max_workers queue here, on the loop
+        self.queued += 1
+        submitted_at = time.monotonic()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+
+        wait = time.monotonic() - submitted_at
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.running += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._get_pool(), call)
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+            self._slots.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth and wait time metrics"""
+        started = self.completed + self.failed + self.running
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queue_depth": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_wait_ms": (self.total_wait / started) * 1000 if started else 0.0,
+            "max_wait_ms": self.max_wait * 1000
+        }
+
+    def shutdown(self) -> None:
+        """Stop the worker pool"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -1,18 +1,104 @@
-from qiskit import QuantumCircuit, ClassicalRegister, QuantumRegister, Aer, execute
-from qiskit.visualization import plot_circuit_layout
-from qiskit.quantum_info import Statevector
 import numpy as np
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Optional, Tuple, TYPE_CHECKING
+from collections import Counter
+import copy
 import json
+import threading
+import time
 from datetime import datetime
 
+from app.services.statevector_engine import StatevectorEngine
+from app.services.noise_engine import DensityMatrixEngine
+
+if TYPE_CHECKING:
+    from qiskit import QuantumCircuit
+
+# Simulator name that selects the in-process NumPy engine instead of Aer
+NUMPY_STATEVECTOR = "numpy_statevector"
+
+# z-score for the 95% Wilson confidence interval on the success rate
+WILSON_Z_95 = 1.959963984540054
+
+# Density matrices evolved at once in a fidelity sweep; bounds its peak memory
+SWEEP_CHUNK_SLICES = 4096
+
+_qiskit = None
+
+def load_qiskit():
+    """
+    Import Qiskit on first use.
+    Qiskit and Aer take seconds to import, so nothing that only serves chat
+    or health checks should pay for them.
+    """
+    global _qiskit
+    if _qiskit is None:
+        import qiskit
+        _qiskit = qiskit
+    return _qiskit
+
 class QuantumTeleportationService:
-    def __init__(self, simulator_name: str = "qasm_simulator", shots: int = 1):
+    def __init__(self, simulator_name: str = "qasm_simulator", shots: int = 1, seed: Optional[int] = None):
         self.simulator_name = simulator_name
         self.shots = shots
-        self.backend = Aer.get_backend(simulator_name)
+        self.engine = StatevectorEngine(seed=seed) if simulator_name == NUMPY_STATEVECTOR else None
+        # Service-side sampling shares the NumPy engine's generator, so a seed covers both
+        self.rng = self.engine.rng if self.engine is not None else np.random.default_rng(seed)
+        self._backend = None
+        
+        # Compiled circuit cache: (bit, backend, options) -> transpiled circuit + metadata
+        self._circuit_cache: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        # Warm-up progress and timings, reported by the readiness endpoint
+        self.warmup_status: Dict[str, Any] = {
+            "state": "cold",
+            "import_ms": None,
+            "compile_ms": None,
+            "first_job_ms": None,
+            "error": None
+        }
+    
+    @property
+    def backend(self):
+        """Aer backend, created on first use (None for the NumPy engine)"""
+        if self._backend is None and self.engine is None:
+            self._backend = load_qiskit().Aer.get_backend(self.simulator_name)
+        return self._backend
     
-    def create_teleportation_circuit(self, classical_bit: int) -> Tuple[QuantumCircuit, Dict[str, Any]]:
+    @property
+    def is_ready(self) -> bool:
+        """Whether Qiskit is loaded, circuits are compiled and a first job has run"""
+        return self.warmup_status["state"] == "ready"
+    
+    def warm_up(self) -> Dict[str, Any]:
+        """
+        Load Qiskit, compile both circuits and run one throwaway teleportation,
+        recording how long each stage takes.
+        """
+        status = self.warmup_status
+        status.update(state="warming", error=None)
+        try:
+            start = time.perf_counter()
+            load_qiskit()
+            _ = self.backend
+            status["import_ms"] = (time.perf_counter() - start) * 1000
+            
+            start = time.perf_counter()
+            self.warm_cache()
+            status["compile_ms"] = (time.perf_counter() - start) * 1000
+            
+            start = time.perf_counter()
+            self.execute_teleportation(0)
+            status["first_job_ms"] = (time.perf_counter() - start) * 1000
+            
+            status["state"] = "ready"
+        except Exception as e:
+            status.update(state="failed", error=str(e))
+        return status
+    
+    def create_teleportation_circuit(self, classical_bit: int) -> Tuple["QuantumCircuit", Dict[str, Any]]:
         """
         Create a quantum teleportation circuit for the given classical bit.
         Returns the circuit and circuit metadata.
@@ -21,9 +107,10 @@ class QuantumTeleportationService:
             raise ValueError("Only classical bit 0 or 1 allowed.")
         
         # Create quantum and classical registers
-        qreg = QuantumRegister(3, 'q')
-        creg = ClassicalRegister(3, 'c')
-        circuit = QuantumCircuit(qreg, creg)
+        qiskit = load_qiskit()
+        qreg = qiskit.QuantumRegister(3, 'q')
+        creg = qiskit.ClassicalRegister(3, 'c')
+        circuit = qiskit.QuantumCircuit(qreg, creg)
         
         # Circuit metadata for visualization
         circuit_data = {
@@ -101,29 +188,206 @@ class QuantumTeleportationService:
         
         return circuit, circuit_data
     
-    def execute_teleportation(self, classical_bit: int) -> Dict[str, Any]:
+    def _cache_key(self, classical_bit: int) -> Tuple[Any, ...]:
+        """Cache key for a compiled circuit: bit, backend and run options"""
+        return (classical_bit, self.simulator_name, (("memory", True), ("shots", self.shots)))
+    
+    def get_compiled_circuit(self, classical_bit: int) -> Dict[str, Any]:
+        """
+        Get the compiled teleportation circuit for the given bit.
+        The circuit is built and transpiled (or compiled to a NumPy program)
+        once per cache key and reused afterwards.
+        """
+        if classical_bit not in (0, 1):
+            raise ValueError("Only classical bit 0 or 1 allowed.")
+        
+        key = self._cache_key(classical_bit)
+        with self._cache_lock:
+            entry = self._circuit_cache.get(key)
+            if entry is not None:
+                self.cache_hits += 1
+                return entry
+            self.cache_misses += 1
+        
+        # Build and transpile outside the lock; a concurrent miss just does the same work
+        circuit, circuit_data = self.create_teleportation_circuit(classical_bit)
+        entry = {
+            "circuit": circuit,
+            "circuit_data": circuit_data,
+            "circuit_diagram": str(circuit)
+        }
+        if self.engine is not None:
+            entry["compiled_circuit"] = self.engine.compile(circuit)
+            entry["outcome_distribution"] = self.engine.outcome_distribution(entry["compiled_circuit"])
+        else:
+            entry["compiled_circuit"] = load_qiskit().transpile(circuit, self.backend)
+        
+        with self._cache_lock:
+            return self._circuit_cache.setdefault(key, entry)
+    
+    def warm_cache(self) -> None:
+        """Build and transpile both teleportation circuits ahead of the first request"""
+        for classical_bit in (0, 1):
+            self.get_compiled_circuit(classical_bit)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get compiled circuit cache statistics"""
+        with self._cache_lock:
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                "size": len(self._circuit_cache),
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "hit_ratio": self.cache_hits / lookups if lookups else 0.0,
+                "backend": self.simulator_name,
+                "shots": self.shots
+            }
+    
+    def _run_compiled(self, compiled: Dict[str, Any], shots: int) -> Tuple[str, Dict[str, int]]:
+        """
+        Run a cached circuit for all shots in one call.
+        Returns the measurement string of one representative shot and the
+        counts per measurement string. Multi-shot runs never materialize
+        per-shot results, so the cost does not grow with the shot count.
+        """
+        if self.engine is not None:
+            num_clbits = compiled["compiled_circuit"][1]
+            if shots == 1:
+                outcome = self.engine.run(compiled["compiled_circuit"], shots=1)[0]
+                measurement_string = format(int(outcome), f"0{num_clbits}b")
+                return measurement_string, {measurement_string: 1}
+            
+            # Sample every shot at once from the analytic outcome distribution
+            outcome_counts = self.engine.sample_counts(compiled["outcome_distribution"], shots)
+            counts = {
+                format(outcome, f"0{num_clbits}b"): int(count)
+                for outcome, count in enumerate(outcome_counts) if count
+            }
+        else:
+            job = self.backend.run(compiled["compiled_circuit"], shots=shots, memory=shots == 1)
+            result = job.result()
+            if shots == 1:
+                measurement_string = result.get_memory()[0]
+                return measurement_string, {measurement_string: 1}
+            counts = result.get_counts()
+        
+        # Shots are exchangeable, so any shot drawn from the counts is representative
+        outcomes = list(counts)
+        frequencies = np.array([counts[outcome] for outcome in outcomes], dtype=float) / shots
+        return outcomes[self.rng.choice(len(outcomes), p=frequencies)], counts
+    
+    @staticmethod
+    def _received_bit(measurement_string: str) -> int:
+        """Extract the teleported bit from a measurement string"""
+        # Classical bit 2 holds the receiver qubit; Qiskit strings list bit 0 last
+        return int(measurement_string[0])
+    
+    @classmethod
+    def _shot_statistics(cls, classical_bit: int, counts: Dict[str, int], shots: int) -> Dict[str, Any]:
+        """
+        Success rate over all shots (receiver bit equals the sent bit) with a
+        95% Wilson score confidence interval.
+        """
+        success_count = sum(
+            count for outcome, count in counts.items()
+            if cls._received_bit(outcome) == classical_bit
+        )
+        success_rate = success_count / shots
+        
+        z = WILSON_Z_95
+        denominator = 1 + z ** 2 / shots
+        center = (success_rate + z ** 2 / (2 * shots)) / denominator
+        margin = z * np.sqrt(success_rate * (1 - success_rate) / shots + z ** 2 / (4 * shots ** 2)) / denominator
+        
+        return {
+            "shots": shots,
+            "counts": counts,
+            "success_count": success_count,
+            "success_rate": success_rate,
+            "confidence_interval": {
+                "level": 0.95,
+                "lower": max(0.0, float(center - margin)),
+                "upper": min(1.0, float(center + margin))
+            }
+        }
+    
+    def _run_batch(self, bits: List[int]) -> List[str]:
+        """
+        Teleport every bit in one simulator pass, one shot per bit.
+        Returns one measurement string per input bit, in order.
+        """
+        if self.engine is not None:
+            # Bit 1 differs from bit 0 only by the initial X, so start each
+            # shot of the bit 0 program in |bit⟩ and run them all together
+            compiled_circuit = self.get_compiled_circuit(0)["compiled_circuit"]
+            outcomes = self.engine.run(
+                compiled_circuit,
+                shots=len(bits),
+                initial_indices=np.asarray(bits, dtype=np.int64)
+            )
+            return self.engine.to_bitstrings(outcomes, compiled_circuit[1])
+        
+        # One Aer job holding both circuits, with enough shots for the larger group
+        bit_counts = Counter(bits)
+        circuits = [self.get_compiled_circuit(bit)["compiled_circuit"] for bit in (0, 1)]
+        job = self.backend.run(circuits, shots=max(bit_counts.values()), memory=True)
+        result = job.result()
+        memories = {bit: iter(result.get_memory(bit)) for bit in (0, 1) if bit_counts[bit]}
+        return [next(memories[bit]) for bit in bits]
+    
+    def execute_batch_teleportation(self, bits: List[int]) -> Dict[str, Any]:
+        """
+        Teleport a sequence of classical bits and return a compact per-bit result.
+        """
+        if not bits:
+            raise ValueError("At least one bit is required.")
+        if any(bit not in (0, 1) for bit in bits):
+            raise ValueError("Only classical bit 0 or 1 allowed.")
+        
+        try:
+            measurement_strings = self._run_batch(bits)
+            received_bits = [self._received_bit(m) for m in measurement_strings]
+            success_count = sum(1 for sent, received in zip(bits, received_bits) if sent == received)
+            
+            return {
+                "batch": True,
+                "bit_count": len(bits),
+                "sent_bits": "".join(str(bit) for bit in bits),
+                "received_bits": "".join(str(bit) for bit in received_bits),
+                "classical_bits": measurement_strings,
+                "success": success_count == len(bits),
+                "success_count": success_count,
+                "success_rate": success_count / len(bits),
+                "simulator": self.simulator_name
+            }
+            
+        except Exception as e:
+            raise Exception(f"Quantum teleportation failed: {str(e)}")
+    
+    def execute_teleportation(self, classical_bit: int, shots: Optional[int] = None) -> Dict[str, Any]:
         """
         Execute quantum teleportation and return detailed results.
+        With more than one shot, all shots are sampled in one call and the
+        result includes per-outcome counts and success statistics.
         """
+        shots = shots or self.shots
         try:
-            # Create circuit
-            circuit, circuit_data = self.create_teleportation_circuit(classical_bit)
+            # Get the cached, already compiled circuit
+            compiled = self.get_compiled_circuit(classical_bit)
+            circuit_data = copy.deepcopy(compiled["circuit_data"])
             
             # Execute the circuit
-            job = execute(circuit, self.backend, shots=self.shots, memory=True)
-            result = job.result()
-            memory = result.get_memory()
+            measurement_string, counts = self._run_compiled(compiled, shots)
             
-            # Get measurement results
-            measurement_string = memory[0]  # e.g., "010"
+            # Get measurement results (e.g., "010")
             classical_bits = measurement_string
-            received_bit = int(measurement_string[2])  # Last bit is the teleported state
+            received_bit = self._received_bit(measurement_string)
             
             # Verify teleportation success
             success = received_bit == classical_bit
             
-            # Generate circuit diagram
-            circuit_diagram = str(circuit)
+            # Circuit diagram is rendered once when the circuit is cached
+            circuit_diagram = compiled["circuit_diagram"]
             
             # Update circuit data with results
             circuit_data["final_state"] = f"|{received_bit}⟩"
@@ -134,14 +398,14 @@ class QuantumTeleportationService:
             }
             
             # Calculate success probability (for multiple shots)
-            if self.shots > 1:
-                counts = result.get_counts()
-                success_count = counts.get(measurement_string, 0)
-                success_probability = success_count / self.shots
+            shot_statistics = None
+            if shots > 1:
+                shot_statistics = self._shot_statistics(classical_bit, counts, shots)
+                success_probability = shot_statistics["success_rate"]
             else:
                 success_probability = 1.0 if success else 0.0
             
-            return {
+            result = {
                 "success": success,
                 "sent_bit": classical_bit,
                 "received_bit": received_bit,
@@ -162,21 +426,105 @@ class QuantumTeleportationService:
                     "steps": circuit_data["steps"]
                 }
             }
+            if shot_statistics:
+                result["shot_statistics"] = shot_statistics
+            return result
             
         except Exception as e:
             raise Exception(f"Quantum teleportation failed: {str(e)}")
     
-    def get_circuit_visualization(self, classical_bit: int) -> Dict[str, Any]:
+    def fidelity_sweep(
+        self,
+        depolarizing: List[float],
+        amplitude_damping: List[float],
+        readout_error: List[float]
+    ) -> Dict[str, Any]:
         """
-        Get detailed circuit visualization data.
+        Teleportation fidelity over the full grid of noise parameters.
+        The depolarizing x amplitude-damping grid, for both input bits, is
+        evaluated in vectorized density-matrix passes over the bit 0
+        circuit; readout error is then applied analytically to the
+        receiver's measurement.
         """
-        circuit, circuit_data = self.create_teleportation_circuit(classical_bit)
+        compiled = self.get_compiled_circuit(0)
+        if "density_program" not in compiled:
+            compiled["density_program"] = DensityMatrixEngine.compile(StatevectorEngine.compile(compiled["circuit"]))
+        
+        depolarizing_grid = np.asarray(depolarizing, dtype=float)
+        damping_grid = np.asarray(amplitude_damping, dtype=float)
+        readout_grid = np.asarray(readout_error, dtype=float)
+        
+        # One slice per (input bit, depolarizing, damping) combination,
+        # evolved in fixed-size chunks so large grids do not hold every slice at once
+        bits, p, gamma = (axis.ravel() for axis in np.meshgrid([0, 1], depolarizing_grid, damping_grid, indexing="ij"))
+        fidelity_by_bit = np.empty(len(bits))
+        for start in range(0, len(bits), SWEEP_CHUNK_SLICES):
+            chunk = slice(start, start + SWEEP_CHUNK_SLICES)
+            rho = DensityMatrixEngine.run(
+                compiled["density_program"],
+                initial_indices=bits[chunk],
+                depolarizing=p[chunk],
+                amplitude_damping=gamma[chunk]
+            )
+            # Receiver qubit 2 should end up in the sent basis state
+            fidelity_by_bit[chunk] = DensityMatrixEngine.marginal_probability(rho, 2, bits[chunk])
+        fidelity_by_bit = fidelity_by_bit.reshape(2, len(depolarizing_grid), len(damping_grid))
+        fidelity = fidelity_by_bit.mean(axis=0)
+        
+        # Symmetric readout flip on the final measurement
+        e = readout_grid[np.newaxis, np.newaxis, :]
+        success_probability = fidelity[:, :, np.newaxis] * (1 - e) + (1 - fidelity[:, :, np.newaxis]) * e
         
         return {
-            "circuit_text": str(circuit),
-            "circuit_data": circuit_data,
-            "num_qubits": 3,
-            "num_classical_bits": 3,
-            "depth": circuit.depth(),
-            "gate_count": circuit.count_ops()
+            "grid": {
+                "depolarizing": depolarizing_grid.tolist(),
+                "amplitude_damping": damping_grid.tolist(),
+                "readout_error": readout_grid.tolist()
+            },
+            "points": int(success_probability.size),
+            "fidelity": fidelity.tolist(),
+            "fidelity_by_input": {"0": fidelity_by_bit[0].tolist(), "1": fidelity_by_bit[1].tolist()},
+            "success_probability": success_probability.tolist()
         }
+    
+    def get_circuit_visualization(self, classical_bit: int) -> Dict[str, Any]:
+        """
+        Get detailed circuit visualization data.
+        Rendered once per cached circuit; callers must not mutate the result.
+        """
+        compiled = self.get_compiled_circuit(classical_bit)
+        if "visualization" not in compiled:
+            circuit = compiled["circuit"]
+            compiled["visualization"] = {
+                "circuit_text": compiled["circuit_diagram"],
+                "circuit_data": compiled["circuit_data"],
+                "num_qubits": 3,
+                "num_classical_bits": 3,
+                "depth": circuit.depth(),
+                "gate_count": dict(circuit.count_ops())
+            }
+        return compiled["visualization"]
+    
+    def get_circuit_gate_list(self, classical_bit: int) -> Dict[str, Any]:
+        """
+        Get the circuit as a compact, ordered list of operations.
+        Lets clients draw the circuit without parsing the text diagram.
+        """
+        compiled = self.get_compiled_circuit(classical_bit)
+        if "gate_list" not in compiled:
+            circuit = compiled["circuit"]
+            compiled["gate_list"] = {
+                "num_qubits": circuit.num_qubits,
+                "num_classical_bits": circuit.num_clbits,
+                "depth": circuit.depth(),
+                "operations": [
+                    {
+                        "name": instruction.operation.name,
+                        "qubits": [circuit.find_bit(q).index for q in instruction.qubits],
+                        "clbits": [circuit.find_bit(c).index for c in instruction.clbits]
+                    }
+                    for instruction in circuit.data
+                ],
+                "steps": compiled["circuit_data"]["steps"]
+            }
+        return compiled["gate_list"]
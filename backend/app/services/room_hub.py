@@ -0,0 +1,157 @@
+from collections import defaultdict
+from typing import Any, Dict, Optional, Set
+import asyncio
+import threading
+
+from app.core.config import settings
+from app.models.database import Message
+from app.schemas.chat import MessageResponse
+
+# Queued in place of events to tell a subscription's sender to disconnect
+CLOSE = object()
+
+class RoomSubscription:
+    """One WebSocket connection's view of a room: a bounded queue of pending events"""
+
+    def __init__(self, room_id: str, max_queue: int):
+        self.room_id = room_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.loop = asyncio.get_running_loop()
+        self.dropped = False
+
+    def deliver(self, event: Dict[str, Any]) -> bool:
+        """
+        Queue an event without waiting. A full queue means the client is not
+        keeping up: its backlog is discarded and it is told to disconnect, so
+        one stalled client never holds up delivery to the others.
+        """
+        if self.dropped:
+            return False
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.dropped = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(CLOSE)
+            return False
+
+class RoomHub:
+    """
+    In-process pub/sub of room events (new messages, joins and leaves) for
+    WebSocket subscribers. Publishing never blocks: each subscriber has its
+    own bounded send queue drained by its connection.
+
+    Events only reach subscribers connected to the same process.
+    """
+
+    def __init__(self, max_queue: int = 100):
+        self.max_queue = max_queue
+        self._rooms: Dict[str, Set[RoomSubscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self.dropped_subscribers = 0
+
+    def subscribe(self, room_id: str) -> RoomSubscription:
+        """Subscribe to a room's events; call from the event loop"""
+        subscription = RoomSubscription(room_id, self.max_queue)
+        with self._lock:
+            self._rooms[room_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: RoomSubscription) -> None:
+        """Stop delivering events to a subscription"""
+        with self._lock:
+            subscribers = self._rooms.get(subscription.room_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._rooms[subscription.room_id]
+
+    def publish(self, room_id: str, event: Dict[str, Any]) -> int:
+        """
+        Fan an event out to a room's subscribers. Safe to call from the event
+        loop or from worker threads. Returns the number of subscribers reached.
+        """
+        with self._lock:
+            subscribers = list(self._rooms.get(room_id, ()))
+            self.published += 1
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        reached = 0
+        for subscription in subscribers:
+            if subscription.loop is running_loop:
+                reached += self._deliver(subscription, event)
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(self._deliver, subscription, event)
+                reached += 1
+            except RuntimeError:
+                # The connection's event loop has shut down
+                self._drop(subscription)
+
+        with self._lock:
+            self.delivered += reached
+        return reached
+
+    def _deliver(self, subscription: RoomSubscription, event: Dict[str, Any]) -> bool:
+        delivered = subscription.deliver(event)
+        if not delivered:
+            self._drop(subscription)
+        return delivered
+
+    def _drop(self, subscription: RoomSubscription) -> None:
+        """Unsubscribe a slow or dead subscriber"""
+        with self._lock:
+            subscribers = self._rooms.get(subscription.room_id)
+            if subscribers is None or subscription not in subscribers:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._rooms[subscription.room_id]
+            self.dropped_subscribers += 1
+
+    def publish_message(
+        self,
+        message: Message,
+        sender_username: Optional[str],
+        teleportation_result: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """Publish a new message, in the same shape as the message endpoints return it"""
+        payload = MessageResponse(
+            id=message.id,
+            room_id=message.room_id,
+            sender_id=message.sender_id,
+            sender_username=sender_username or "Unknown",
+            content=message.content,
+            quantum_state=message.quantum_state,
+            teleportation_result=teleportation_result,
+            status=message.status,
+            created_at=message.created_at
+        ).model_dump(mode="json")
+        return self.publish(message.room_id, {"type": "message", "message": payload})
+
+    def publish_participant(self, room_id: str, user_id: str, joined: bool) -> int:
+        """Publish a join or leave"""
+        event_type = "participant_joined" if joined else "participant_left"
+        return self.publish(room_id, {"type": event_type, "room_id": room_id, "user_id": user_id})
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get subscriber and delivery counters"""
+        with self._lock:
+            return {
+                "rooms": len(self._rooms),
+                "subscribers": sum(len(subscribers) for subscribers in self._rooms.values()),
+                "published": self.published,
+                "delivered": self.delivered,
+                "dropped_subscribers": self.dropped_subscribers,
+                "send_queue_size": self.max_queue
+            }
+
+room_hub = RoomHub(max_queue=settings.WS_SEND_QUEUE_SIZE)
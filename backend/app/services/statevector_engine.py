@@ -0,0 +1,148 @@
+import numpy as np
+from typing import Any, List, Optional, Tuple
+
+# Gates understood by the engine, as produced by the teleportation circuit
+SUPPORTED_OPERATIONS = ("x", "h", "cx", "cz", "measure", "barrier")
+
+_HADAMARD = np.array([[1, 1], [1, -1]], dtype=np.complex128) / np.sqrt(2)
+
+class StatevectorEngine:
+    """
+    Pure-NumPy statevector simulator for small circuits.
+
+    Qubit and classical bit ordering follows Qiskit: qubit k is bit k of the
+    basis-state index, and measurement strings list classical bit 0 last.
+    All shots are simulated together as one (shots, 2**n) array.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = np.random.default_rng(seed)
+
+    @staticmethod
+    def compile(circuit: Any) -> Tuple[int, int, List[Tuple[str, Tuple[int, ...], Tuple[int, ...]]]]:
+        """
+        Convert a QuantumCircuit into a flat program of (name, qubits, clbits).
+        Done once per circuit so the hot path never touches Qiskit objects.
+        """
+        program = []
+        for instruction in circuit.data:
+            name = instruction.operation.name
+            if name not in SUPPORTED_OPERATIONS:
+                raise ValueError(f"Unsupported operation for numpy statevector engine: {name}")
+            if name == "barrier":
+                continue
+            qubits = tuple(circuit.find_bit(q).index for q in instruction.qubits)
+            clbits = tuple(circuit.find_bit(c).index for c in instruction.clbits)
+            program.append((name, qubits, clbits))
+        return circuit.num_qubits, circuit.num_clbits, program
+
+    def run(
+        self,
+        compiled: Tuple[int, int, list],
+        shots: int = 1,
+        initial_indices: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Run a compiled program and return one integer outcome per shot.
+        Classical bit k of the outcome is bit k of the integer.
+        initial_indices optionally starts each shot in its own basis state,
+        so different inputs can share a single vectorized pass.
+        """
+        num_qubits, num_clbits, program = compiled
+        dim = 2 ** num_qubits
+        index = np.arange(dim)
+
+        state = np.zeros((shots, dim), dtype=np.complex128)
+        if initial_indices is None:
+            state[:, 0] = 1.0
+        else:
+            state[np.arange(shots), initial_indices] = 1.0
+        outcomes = np.zeros(shots, dtype=np.int64)
+
+        for name, qubits, clbits in program:
+            if name == "measure":
+                state, bits = self._measure(state, qubits[0], index)
+                outcomes |= bits.astype(np.int64) << clbits[0]
+            else:
+                state = self._apply_gate(state, name, qubits, index, num_qubits)
+
+        return outcomes
+
+    @classmethod
+    def outcome_distribution(cls, compiled: Tuple[int, int, list], initial_index: int = 0) -> np.ndarray:
+        """
+        Exact probability of every classical outcome, indexed like run() outcomes.
+        Each measurement splits every branch in two instead of sampling, so the
+        result is the analytic distribution the shots are drawn from.
+        """
+        num_qubits, num_clbits, program = compiled
+        index = np.arange(2 ** num_qubits)
+
+        state = np.zeros((1, 2 ** num_qubits), dtype=np.complex128)
+        state[0, initial_index] = 1.0
+        weights = np.ones(1)
+        outcomes = np.zeros(1, dtype=np.int64)
+
+        for name, qubits, clbits in program:
+            if name != "measure":
+                state = cls._apply_gate(state, name, qubits, index, num_qubits)
+                continue
+
+            is_one = ((index >> qubits[0]) & 1).astype(bool)
+            branches = [np.where(is_one, 0, state), np.where(is_one, state, 0)]
+            norms = [(np.abs(branch) ** 2).sum(axis=1) for branch in branches]
+
+            # Keep only branches that can actually occur
+            state = np.concatenate(branches)
+            p_branch = np.concatenate(norms)
+            weights = np.concatenate([weights * norms[0], weights * norms[1]])
+            outcomes = np.concatenate([outcomes, outcomes | (1 << clbits[0])])
+            possible = p_branch > 1e-12
+            state = state[possible] / np.sqrt(p_branch[possible])[:, np.newaxis]
+            weights, outcomes = weights[possible], outcomes[possible]
+
+        distribution = np.bincount(outcomes, weights=weights, minlength=2 ** num_clbits)
+        return distribution / distribution.sum()
+
+    def sample_counts(self, distribution: np.ndarray, shots: int) -> np.ndarray:
+        """Draw counts per outcome for all shots in a single multinomial sample"""
+        return self.rng.multinomial(shots, distribution)
+
+    @classmethod
+    def _apply_gate(cls, state: np.ndarray, name: str, qubits: Tuple[int, ...], index: np.ndarray, num_qubits: int) -> np.ndarray:
+        """Apply one non-measurement operation across all shots"""
+        if name == "x":
+            return state[:, index ^ (1 << qubits[0])]
+        if name == "h":
+            return cls._apply_single(state, _HADAMARD, qubits[0], num_qubits)
+        if name == "cx":
+            control, target = qubits
+            return state[:, index ^ (((index >> control) & 1) << target)]
+        if name == "cz":
+            control, target = qubits
+            return state * np.where((index >> control) & (index >> target) & 1, -1.0, 1.0)
+        raise ValueError(f"Unsupported operation for numpy statevector engine: {name}")
+
+    @staticmethod
+    def _apply_single(state: np.ndarray, gate: np.ndarray, qubit: int, num_qubits: int) -> np.ndarray:
+        """Apply a 2x2 gate to one qubit across all shots"""
+        shots = state.shape[0]
+        view = state.reshape(shots, 2 ** (num_qubits - qubit - 1), 2, 2 ** qubit)
+        return np.einsum("ij,skjl->skil", gate, view).reshape(shots, -1)
+
+    def _measure(self, state: np.ndarray, qubit: int, index: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Measure one qubit in every shot and collapse the states"""
+        is_one = ((index >> qubit) & 1).astype(bool)
+        probabilities = np.abs(state) ** 2
+        p_one = probabilities[:, is_one].sum(axis=1)
+
+        bits = self.rng.random(state.shape[0]) < p_one
+        keep = is_one[np.newaxis, :] == bits[:, np.newaxis]
+        norm = np.sqrt(np.where(bits, p_one, 1.0 - p_one))
+
+        return np.where(keep, state, 0) / norm[:, np.newaxis], bits
+
+    @staticmethod
+    def to_bitstrings(outcomes: np.ndarray, num_clbits: int) -> List[str]:
+        """Format integer outcomes as Qiskit-style measurement strings"""
+        return [format(int(outcome), f"0{num_clbits}b") for outcome in outcomes]
@@ -0,0 +1,176 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from typing import Any, Dict, Iterable, List, Optional
+import copy
+import hashlib
+import json
+import threading
+
+from app.models.database import CircuitTemplate
+
+# Version tag of the compact Message.teleportation_result format
+COMPACT_FORMAT_VERSION = 2
+
+# Fields that change from run to run; everything else is rebuilt from the template
+PER_RUN_FIELDS = ("sent_bit", "received_bit", "classical_bits", "success_probability", "shot_statistics")
+
+# Templates never change once written, so they are cached for the process lifetime
+_template_cache: Dict[str, Dict[str, Any]] = {}
+_template_lock = threading.Lock()
+
+def is_compact(stored: Optional[Dict[str, Any]]) -> bool:
+    """Check whether a stored teleportation result uses the compact format"""
+    return isinstance(stored, dict) and stored.get("v") == COMPACT_FORMAT_VERSION
+
+def _template_payload(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract the static circuit template from a full teleportation result"""
+    circuit_data = {
+        key: value for key, value in result["circuit_data"].items()
+        if key != "measurement_results"
+    }
+    circuit_data["final_state"] = None
+    return {"circuit_data": circuit_data, "circuit_diagram": result["circuit_diagram"]}
+
+def _template_id(payload: Dict[str, Any]) -> str:
+    """Content-addressed template ID, so identical circuits share one row"""
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return "tpl_" + hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+def _build_full_result(template: Dict[str, Any], compact: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild the full teleportation result from a template and per-run fields"""
+    sent_bit = compact["sent_bit"]
+    received_bit = compact["received_bit"]
+    classical_bits = compact["classical_bits"]
+    success = received_bit == sent_bit
+    measurement_results = {
+        "classical_bits": classical_bits,
+        "received_bit": received_bit,
+        "success": success
+    }
+
+    circuit_data = copy.deepcopy(template["circuit_data"])
+    circuit_data["final_state"] = f"|{received_bit}⟩"
+    circuit_data["measurement_results"] = dict(measurement_results)
+
+    result = {
+        "success": success,
+        "sent_bit": sent_bit,
+        "received_bit": received_bit,
+        "classical_bits": classical_bits,
+        "receiver_state": f"|{received_bit}⟩",
+        "circuit_diagram": template["circuit_diagram"],
+        "circuit_data": circuit_data,
+        "success_probability": compact["success_probability"],
+        "measurement_results": measurement_results,
+        "teleportation_data": {
+            "circuit": circuit_data,
+            "measurements": circuit_data["measurements"],
+            "gates": circuit_data["gates"],
+            "steps": circuit_data["steps"]
+        }
+    }
+    if "shot_statistics" in compact:
+        result["shot_statistics"] = compact["shot_statistics"]
+    return result
+
+class TeleportationResultStore:
+    """
+    Converts teleportation results between the full structure returned by
+    QuantumTeleportationService and the compact stored format:
+
+        {"v": 2, "template": "tpl_...", "sent_bit": 1, "received_bit": 1,
+         "classical_bits": "101", "success_probability": 1.0}
+
+    The static circuit description lives once in circuit_templates.
+    Results that do not round-trip exactly (e.g. batch results, which are
+    already compact) are stored unchanged.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def compact(self, result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Convert a full teleportation result to the compact format"""
+        if not isinstance(result, dict) or is_compact(result):
+            return result
+        try:
+            payload = _template_payload(result)
+            compact = {"v": COMPACT_FORMAT_VERSION, "template": _template_id(payload)}
+            compact.update({key: result[key] for key in PER_RUN_FIELDS if key in result})
+            if _build_full_result(payload, compact) != json.loads(json.dumps(result)):
+                return result
+        except (KeyError, TypeError, AttributeError):
+            return result
+
+        self._ensure_template(compact["template"], payload)
+        return compact
+
+    def expand(self, stored: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Rebuild the full teleportation result from its stored form"""
+        if not is_compact(stored):
+            return stored
+        template = self.get_template(stored["template"])
+        if template is None:
+            return stored
+        return _build_full_result(template, stored)
+
+    def expand_many(self, stored_results: Iterable[Optional[Dict[str, Any]]]) -> List[Optional[Dict[str, Any]]]:
+        """Expand a page of results, loading any missing templates in one query"""
+        stored_results = list(stored_results)
+        self._load_templates({s["template"] for s in stored_results if is_compact(s)})
+        return [self.expand(stored) for stored in stored_results]
+
+    def get_template(self, template_id: str) -> Optional[Dict[str, Any]]:
+        """Get a circuit template by ID"""
+        self._load_templates({template_id})
+        return _template_cache.get(template_id)
+
+    def _load_templates(self, template_ids: set) -> None:
+        missing = [template_id for template_id in template_ids if template_id not in _template_cache]
+        if not missing:
+            return
+        rows = self.db.query(CircuitTemplate).filter(CircuitTemplate.id.in_(missing)).all()
+        with _template_lock:
+            for row in rows:
+                _template_cache[row.id] = {"circuit_data": row.circuit_data, "circuit_diagram": row.circuit_diagram}
+
+    def _insert_template(self, template_id: str, payload: Dict[str, Any]) -> bool:
+        """
+        Insert the template row unless it already exists, without committing.
+        Returns True if a row was inserted. Concurrent first writes of the
+        same template cannot collide on the primary key.
+        """
+        values = {
+            "id": template_id,
+            "circuit_data": payload["circuit_data"],
+            "circuit_diagram": payload["circuit_diagram"]
+        }
+        dialect = self.db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+            statement = insert(CircuitTemplate).values(**values).on_conflict_do_nothing(index_elements=["id"])
+            return self.db.execute(statement).rowcount == 1
+        
+        # Other databases: let the primary key reject the duplicate
+        try:
+            with self.db.begin_nested():
+                self.db.add(CircuitTemplate(**values))
+            return True
+        except IntegrityError:
+            return False
+
+    def _ensure_template(self, template_id: str, payload: Dict[str, Any]) -> None:
+        """Insert the template row unless it is already known to be stored"""
+        if template_id in _template_cache:
+            return
+        if not self._insert_template(template_id, payload):
+            # Only cache templates seen committed, so a rolled-back insert is retried
+            with _template_lock:
+                _template_cache[template_id] = payload
+
+def clear_template_cache() -> None:
+    """Forget cached templates, e.g. after the database has been reset"""
+    with _template_lock:
+        _template_cache.clear()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark response serialization for the chat endpoints: the standard path
+(response_model validation + stdlib json) against the FAST_JSON_RESPONSES
+path (models validated once, encoded with orjson). No database is needed.
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+import asyncio
+import time
+import uuid
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from app.api import chat
+from app.services.teleportation_storage import _build_full_result
+
+def sample_teleportation_result(bit: int) -> dict:
+    """A full teleportation result shaped like the simulator's output"""
+    template = {
+        "circuit_data": {
+            "num_qubits": 3,
+            "num_clbits": 3,
+            "gates": [{"name": name, "qubits": [q % 3], "step": step}
+                      for step, (name, q) in enumerate([("x", 0), ("h", 1), ("cx", 1), ("cx", 0), ("h", 0),
+                                                        ("measure", 0), ("measure", 1), ("cx", 1), ("cz", 0),
+                                                        ("measure", 2)])],
+            "measurements": [{"qubit": q, "clbit": q} for q in range(3)],
+            "steps": [{"step": step, "description": f"Step {step} of the teleportation protocol"} for step in range(8)],
+            "final_state": None
+        },
+        "circuit_diagram": "q_0: ──■──┤ H ├─┤M├────────\n" * 20
+    }
+    return _build_full_result(template, {
+        "sent_bit": bit, "received_bit": bit, "classical_bits": f"{bit}01", "success_probability": 1.0
+    })
+
+def sample_user(index: int) -> SimpleNamespace:
+    now = datetime.utcnow()
+    return SimpleNamespace(id=str(uuid.uuid4()), username=f"user{index}", email=f"user{index}@entangleme.local",
+                           is_online=True, last_seen=now, created_at=now)
+
+def sample_messages(count: int) -> list:
+    sender = sample_user(0)
+    messages = []
+    for index in range(count):
+        message = SimpleNamespace(id=str(uuid.uuid4()), room_id="room", sender_id=sender.id,
+                                  content=f"Teleported bit: {index % 2}", quantum_state=str(index % 2),
+                                  status="teleported", created_at=datetime.utcnow())
+        messages.append(chat.message_response(message, sender.username, sample_teleportation_result(index % 2)))
+    return messages
+
+def sample_rooms(count: int) -> list:
+    rooms = []
+    for index in range(count):
+        participants = [SimpleNamespace(user=sample_user(n)) for n in range(2)]
+        room = SimpleNamespace(id=str(uuid.uuid4()), name=f"Room {index}", created_by=participants[0].user.id,
+                               created_at=datetime.utcnow(), last_activity=datetime.utcnow(),
+                               retention_days=None, participants=participants)
+        rooms.append(chat.room_response(room))
+    return rooms
+
+def response_field(path: str):
+    for route in chat.router.routes:
+        if isinstance(route, APIRoute) and route.path == path and "GET" in route.methods:
+            return route.response_field
+    raise ValueError(f"No GET route for {path}")
+
+async def standard_path(field, content) -> bytes:
+    """What FastAPI does with models returned from a route with response_model"""
+    return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+async def fast_path(field, content) -> bytes:
+    """What respond() does with FAST_JSON_RESPONSES enabled"""
+    if isinstance(content, list):
+        return ORJSONResponse([item.model_dump() for item in content]).body
+    return ORJSONResponse(content.model_dump()).body
+
+async def time_path(path_function, field, content, repeat: int) -> float:
+    await path_function(field, content)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await path_function(field, content)
+    return (time.perf_counter() - start) / repeat * 1000
+
+async def benchmark():
+    print("🧪 Benchmarking response serialization...")
+    print("=" * 50)
+
+    cases = [
+        ("GET /chat/rooms/{room_id}/messages (50)", "/chat/rooms/{room_id}/messages", sample_messages(50), 200),
+        ("GET /chat/rooms/{room_id}/messages (500)", "/chat/rooms/{room_id}/messages", sample_messages(500), 20),
+        ("GET /chat/rooms (100)", "/chat/rooms", sample_rooms(100), 200),
+        ("GET /chat/users/{user_id}", "/chat/users/{user_id}", chat.user_response(sample_user(0)), 2000)
+    ]
+    for label, path, content, repeat in cases:
+        field = response_field(path)
+        standard_ms = await time_path(standard_path, field, content, repeat)
+        fast_ms = await time_path(fast_path, field, content, repeat)
+        print(f"📡 {label}")
+        print(f"   standard: {standard_ms:.3f} ms   fast: {fast_ms:.3f} ms   speedup: {standard_ms / fast_ms:.1f}x")
+
+if __name__ == "__main__":
+    asyncio.run(benchmark())
@@ -3,7 +3,7 @@
 Test script for quantum teleportation functionality
 """
 
-from app.services.quantum_service import QuantumTeleportationService
+from app.services.quantum_service import QuantumTeleportationService, NUMPY_STATEVECTOR
 
 def test_quantum_teleportation():
     """Test quantum teleportation for both 0 and 1 bits"""
@@ -41,5 +41,33 @@ def test_quantum_teleportation():
     print("🎉 All tests completed successfully!")
     print("=" * 50)
 
+def test_numpy_statevector_engine():
+    """Test that the NumPy engine returns the same result shape as Aer"""
+    print("🧪 Testing NumPy statevector engine...")
+    print("=" * 50)
+    
+    aer_service = QuantumTeleportationService()
+    numpy_service = QuantumTeleportationService(simulator_name=NUMPY_STATEVECTOR)
+    
+    for bit in (0, 1):
+        aer_result = aer_service.execute_teleportation(bit)
+        numpy_result = numpy_service.execute_teleportation(bit)
+        assert set(numpy_result) == set(aer_result)
+        assert numpy_result["circuit_data"]["gates"] == aer_result["circuit_data"]["gates"]
+        assert numpy_result["circuit_diagram"] == aer_result["circuit_diagram"]
+        # The receiver qubit (classical bit 2, leftmost) always carries the sent bit
+        assert numpy_result["classical_bits"][0] == str(bit)
+        print(f"✅ Bit {bit}: classical bits {numpy_result['classical_bits']}")
+    
+    # Multi-shot statistics count every shot where the receiver got the sent bit
+    stats = numpy_service.execute_teleportation(1, shots=100000)["shot_statistics"]
+    assert sum(stats["counts"].values()) == 100000
+    assert stats["success_rate"] == 1.0
+    print(f"✅ 100000 shots: success rate {stats['success_rate']}, CI {stats['confidence_interval']}")
+    
+    print("🎉 NumPy engine tests completed successfully!")
+    print("=" * 50)
+
 if __name__ == "__main__":
     test_quantum_teleportation()
+    test_numpy_statevector_engine()
@@ -10,6 +10,7 @@ class ApiClient {
   private roomId?: string;
   private messageHandler?: NodeJS.Timeout;
   private roomHandler?: NodeJS.Timeout;
+  private roomSocket?: WebSocket;
   private currentStatus: string = 'waiting';
 
   async getUserByUsername(username: string) {
@@ -310,9 +311,10 @@ class ApiClient {
     }
   }
 
-  async getCircuitVisualization(bit: 0 | 1): Promise<any> {
+  async getCircuitVisualization(bit: 0 | 1, format: 'text' | 'gates' = 'text'): Promise<any> {
     try {
-      const response = await fetch(`${API_BASE_URL}/quantum/circuit/${bit}`);
+      // Responses carry an ETag, so the browser cache revalidates with a cheap 304
+      const response = await fetch(`${API_BASE_URL}/quantum/circuit/${bit}?format=${format}`);
       if (!response.ok) {
         throw new Error('Failed to get circuit visualization');
       }
@@ -354,7 +356,10 @@ class ApiClient {
               // Room just became ready - start message polling
               console.log('Starting message polling - 2 users in room');
               pollMessages(); // Initial poll
-              this.messageHandler = setInterval(pollMessages, 2000);
+              // With a live push channel, messages are fetched only when one arrives
+              if (!this.roomSocket) {
+                this.messageHandler = setInterval(pollMessages, 2000);
+              }
             } else if (status === 'waiting' && previousStatus === 'ready') {
               // Room just became waiting - stop message polling
               console.log('Stopping message polling - less than 2 users in room');
@@ -370,11 +375,44 @@ class ApiClient {
       }
     };
 
+    // Subscribe to room events; polling is only the fallback
+    const openRoomSocket = (): boolean => {
+      if (!this.roomId || typeof WebSocket === 'undefined') {
+        return false;
+      }
+      const socket = new WebSocket(`${API_BASE_URL.replace(/^http/, 'ws')}/ws/rooms/${this.roomId}`);
+      socket.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        if ((data.type === 'message' || data.type === 'messages_imported') && this.currentStatus === 'ready') {
+          pollMessages();
+        } else if (data.type === 'participant_joined' || data.type === 'participant_left') {
+          pollRoomStatus();
+        }
+      };
+      socket.onclose = () => {
+        if (this.roomSocket !== socket) {
+          return; // Closed by stopPolling
+        }
+        console.log('Room event channel closed - falling back to polling');
+        this.roomSocket = undefined;
+        if (!this.roomHandler) {
+          this.roomHandler = setInterval(pollRoomStatus, 3000);
+        }
+        if (this.currentStatus === 'ready' && !this.messageHandler) {
+          this.messageHandler = setInterval(pollMessages, 2000);
+        }
+      };
+      this.roomSocket = socket;
+      return true;
+    };
+
     // Initial poll for room status
     pollRoomStatus();
 
-    // Set up room status polling interval
-    this.roomHandler = setInterval(pollRoomStatus, 3000);
+    // Set up room status polling interval if push is unavailable
+    if (!openRoomSocket()) {
+      this.roomHandler = setInterval(pollRoomStatus, 3000);
+    }
   }
 
   stopPolling() {
@@ -386,6 +424,11 @@ class ApiClient {
       clearInterval(this.roomHandler);
       this.roomHandler = undefined;
     }
+    if (this.roomSocket) {
+      const socket = this.roomSocket;
+      this.roomSocket = undefined;
+      socket.close();
+    }
     this.currentStatus = 'waiting';
   }
 }
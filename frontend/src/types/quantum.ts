@@ -29,4 +29,23 @@ export interface CircuitVisualization {
     gate_count: any;
   };
   description: string;
-} 
\ No newline at end of file
+}
+
+export interface CircuitOperation {
+  name: string;
+  qubits: number[];
+  clbits: number[];
+}
+
+export interface CircuitGateList {
+  bit: number;
+  format: 'gates';
+  circuit: {
+    num_qubits: number;
+    num_classical_bits: number;
+    depth: number;
+    operations: CircuitOperation[];
+    steps: any[];
+  };
+  description: string;
+}